@@ -1,8 +1,13 @@
 from fastapi import FastAPI, HTTPException, File, UploadFile
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 import traceback
+import base64
+import json
 import sys
 import os
 
@@ -13,11 +18,24 @@ os.chdir(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Local imports
-from matching2 import find_matching_resumes_by_similarity
-from db import get_db_connection, insert_resume_into_db
-from resume_parser import parse_resume_structured
-from extract_text import extract_text
+from matching2 import find_matching_resumes_by_similarity_async, find_matching_resumes_batch_async, \
+    find_matching_resumes_in_snapshot, rank_matches_async, rank_matches_in_snapshot, hydrate_results_async, \
+    validate_fields, RETRIEVAL_MODES, RESULT_FIELDS, MAX_RANKED_RESULTS, MAX_EF_SEARCH, MAX_PROBES
+from db import init_pool, close_pool, init_async_pool, close_async_pool, SEARCH_MODES
+from resume_parser import ingest_resume_bytes
+import embedding_service
+from jd_cache import get_jd_cache
+from result_cache import get_result_cache
+from ingest_jobs import get_job_queue, IngestWorkers, INGEST_WORKERS
+from extract_text import SUPPORTED_EXTENSIONS
+
 app = FastAPI(title="Resume Matcher API")
+ingest_workers = None
+
+# "postgres" (default) or "mmap" to score against the embedding snapshot
+MATCH_ENGINE = os.environ.get("MATCH_ENGINE", "postgres")
+# Results hydrated per round-trip by /match/stream; small so the first lines go out early
+STREAM_CHUNK_SIZE = 25
 
 # Allow frontend access (change origins for production)
 app.add_middleware(
@@ -28,23 +46,146 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+# ----------- Lifecycle ----------- #
+@app.on_event("startup")
+async def startup():
+    init_pool()
+    await init_async_pool()
+    if os.environ.get("EMBEDDING_WARMUP", "1") == "1":
+        await run_in_threadpool(embedding_service.warmup)
+    if MATCH_ENGINE == "mmap":
+        from mmap_engine import get_snapshot
+        get_snapshot()
+    # INGEST_WORKERS=0 leaves queued uploads to another process sharing the queue
+    global ingest_workers
+    if INGEST_WORKERS > 0:
+        ingest_workers = IngestWorkers(get_job_queue())
+        ingest_workers.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if ingest_workers is not None:
+        await run_in_threadpool(ingest_workers.stop)
+    close_pool()
+    await close_async_pool()
+
+
 # ----------- Request Models ----------- #
 class JDRequest(BaseModel):
     jd_text: str
     top_n: int = 5
+    ef_search: Optional[int] = None  # HNSW recall/latency knob
+    probes: Optional[int] = None     # IVFFlat recall/latency knob
+    search_mode: Optional[str] = None  # auto / iterative / exact / ann
+    retrieval: Optional[str] = None    # multi / title
+    fields: Optional[List[str]] = None  # projection, e.g. ["id"] for ids + scores only
+    page_size: Optional[int] = None     # set (or pass ?cursor=) for a paginated response
+
+
+class BatchJDRequest(BaseModel):
+    jd_texts: List[str]
+    top_n: int = 5
+    ef_search: Optional[int] = None
+    probes: Optional[int] = None
+    search_mode: Optional[str] = None
+    retrieval: Optional[str] = None    # as for /match; "title" shares one ANN query per chunk of JDs
+
+
+def _ann_kwargs(req):
+    # Only override the matcher defaults for knobs the caller actually set
+    knobs = (("ef_search", req.ef_search), ("probes", req.probes), ("search_mode", req.search_mode),
+             ("retrieval", getattr(req, "retrieval", None)))
+    return {k: v for k, v in knobs if v is not None}
 
 
 # ----------- Match Endpoint ----------- #
+def _validate_search_knobs(req):
+    # Checked here so bad values get a 400 instead of a Postgres error on SET LOCAL
+    if req.ef_search is not None and not 1 <= req.ef_search <= MAX_EF_SEARCH:
+        raise HTTPException(status_code=400, detail=f"ef_search must be between 1 and {MAX_EF_SEARCH}")
+    if req.probes is not None and not 1 <= req.probes <= MAX_PROBES:
+        raise HTTPException(status_code=400, detail=f"probes must be between 1 and {MAX_PROBES}")
+    if req.search_mode is not None and req.search_mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"search_mode must be one of {SEARCH_MODES}")
+    if req.retrieval is not None and req.retrieval not in RETRIEVAL_MODES:
+        raise HTTPException(status_code=400, detail=f"retrieval must be one of {RETRIEVAL_MODES}")
+
+
+def _validate_match_request(req):
+    if not req.jd_text.strip():
+        raise HTTPException(status_code=400, detail="jd_text is required")
+    if not 1 <= req.top_n <= MAX_RANKED_RESULTS:
+        raise HTTPException(status_code=400, detail=f"top_n must be between 1 and {MAX_RANKED_RESULTS}")
+    if req.page_size is not None and not 1 <= req.page_size <= MAX_RANKED_RESULTS:
+        raise HTTPException(status_code=400, detail=f"page_size must be between 1 and {MAX_RANKED_RESULTS}")
+    _validate_search_knobs(req)
+    if req.fields is not None:
+        if not req.fields:
+            raise HTTPException(status_code=400, detail="fields must name at least one field; omit it for the defaults")
+        try:
+            validate_fields(req.fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+
+def _encode_cursor(offset, generation):
+    return base64.urlsafe_b64encode(json.dumps({"o": offset, "g": generation}).encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        offset, generation = int(state["o"]), int(state["g"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset, generation
+
+
+async def _ranked_matches(req):
+    if MATCH_ENGINE == "mmap":
+        return await run_in_threadpool(rank_matches_in_snapshot, req.jd_text, MAX_RANKED_RESULTS)
+    return await rank_matches_async(req.jd_text, limit=MAX_RANKED_RESULTS, **_ann_kwargs(req))
+
+
+async def _match_page(req, cursor):
+    offset, cursor_generation = _decode_cursor(cursor) if cursor else (0, None)
+    ranked, generation = await _ranked_matches(req)
+    if cursor_generation is not None and cursor_generation != generation:
+        # Resumes were written since the first page; the ranking may have shifted
+        raise HTTPException(status_code=410, detail="Cursor expired; restart the query without a cursor.")
+    if not ranked and cursor is None:
+        raise HTTPException(status_code=404, detail="No matching resumes found.")
+
+    page_size = req.page_size or req.top_n
+    matches = await hydrate_results_async(ranked[offset:offset + page_size], req.fields or RESULT_FIELDS)
+    next_offset = offset + page_size
+    next_cursor = _encode_cursor(next_offset, generation) if next_offset < len(ranked) else None
+    return {"matches": matches, "next_cursor": next_cursor}
+
+
 @app.post("/match")
-def match_jobs(req: JDRequest):
+async def match_jobs(req: JDRequest, cursor: Optional[str] = None):
     jd_text = req.jd_text
     top_n = req.top_n
-
-    if not jd_text.strip():
-        raise HTTPException(status_code=400, detail="jd_text is required")
+    _validate_match_request(req)
 
     try:
-        results = find_matching_resumes_by_similarity(jd_text, top_n=top_n, debug=False)
+        if cursor is not None or req.page_size is not None:
+            return await _match_page(req, cursor)
+
+        if req.fields is not None:
+            ranked, _ = await _ranked_matches(req)
+            results = await hydrate_results_async(ranked[:top_n], req.fields)
+        elif MATCH_ENGINE == "mmap":
+            results = await run_in_threadpool(find_matching_resumes_in_snapshot, jd_text, top_n, False)
+        else:
+            results = await find_matching_resumes_by_similarity_async(
+                jd_text, top_n=top_n, debug=False, **_ann_kwargs(req)
+            )
 
         if not results:
             raise HTTPException(status_code=404, detail="No matching resumes found.")
@@ -60,19 +201,64 @@ def match_jobs(req: JDRequest):
         )
 
 
+# ----------- Streaming Match Endpoint ----------- #
+@app.post("/match/stream")
+async def match_jobs_stream(req: JDRequest):
+    """NDJSON: one ranked match per line, hydrated STREAM_CHUNK_SIZE at a time."""
+    _validate_match_request(req)
+
+    try:
+        ranked, _ = await _ranked_matches(req)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error running matching logic: {e}\n{traceback.format_exc()}",
+        )
+    ranked = ranked[:req.top_n]
+    fields = req.fields or RESULT_FIELDS
+
+    async def lines():
+        for start in range(0, len(ranked), STREAM_CHUNK_SIZE):
+            for match in await hydrate_results_async(ranked[start:start + STREAM_CHUNK_SIZE], fields):
+                yield json.dumps(match, default=str) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+# ----------- Batch Match Endpoint ----------- #
+@app.post("/match/batch")
+async def match_jobs_batch(req: BatchJDRequest):
+    if not req.jd_texts or any(not jd_text.strip() for jd_text in req.jd_texts):
+        raise HTTPException(status_code=400, detail="jd_texts must be a non-empty list of non-empty strings")
+    if req.top_n < 1:
+        raise HTTPException(status_code=400, detail="top_n must be at least 1")
+    _validate_search_knobs(req)
+
+    try:
+        results = await find_matching_resumes_batch_async(req.jd_texts, top_n=req.top_n, **_ann_kwargs(req))
+        return {"results": [{"jd_index": i, "matches": matches} for i, matches in enumerate(results)]}
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error running batch matching logic: {e}\n{traceback.format_exc()}",
+        )
+
+
+# ----------- Cache Stats Endpoint ----------- #
+@app.get("/cache/stats")
+def cache_stats():
+    return {"jd_cache": get_jd_cache().stats(), "result_cache": get_result_cache().stats()}
+
+
 # ----------- Resume Upload Endpoint ----------- #
 @app.post("/upload_resume")
 async def upload_resume(file: UploadFile = File(...)):
     try:
         content = await file.read()
-        text = extract_text(content, file.filename)
-        structured_info = parse_resume_structured(text)
+        status = await run_in_threadpool(ingest_resume_bytes, content, file.filename)
 
-        conn = get_db_connection()
-        success = insert_resume_into_db(conn, structured_info)
-        conn.close()
-
-        return {"status": "ok" if success else "skipped"}
+        return {"status": status}
 
     except Exception as e:
         raise HTTPException(
@@ -81,6 +267,36 @@ async def upload_resume(file: UploadFile = File(...)):
         )
 
 
+# ----------- Bulk Upload / Job Status Endpoints ----------- #
+@app.post("/upload_resume/batch")
+async def upload_resume_batch(files: List[UploadFile] = File(...)):
+    """Spool the files and queue them for the ingest workers; poll /jobs/{job_id}."""
+    if not files:
+        raise HTTPException(status_code=400, detail="At least one file is required")
+    unsupported = [f.filename for f in files if os.path.splitext(f.filename or "")[1].lower() not in SUPPORTED_EXTENSIONS]
+    if unsupported:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file format for {unsupported}; only {', '.join(SUPPORTED_EXTENSIONS)} are supported",
+        )
+    try:
+        job_id = await run_in_threadpool(get_job_queue().create_job, [(f.filename, f.file) for f in files])
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error queueing files: {e}\n{traceback.format_exc()}",
+        )
+    return {"job_id": job_id, "files": len(files)}
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    status = get_job_queue().job_status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
 
@@ -1,3 +1,4 @@
+import time
 import streamlit as st
 import requests
 import pandas as pd
@@ -5,6 +6,13 @@ import pandas as pd
 API_URL = "http://127.0.0.1:8000/match"
 BACKEND_URL = "http://127.0.0.1:8000"  # Added
 
+# Seconds a JD/top_n result is reused across button presses and reruns
+MATCH_CACHE_TTL = 300
+# Seconds the UI waits on a bulk upload job before leaving it to the background
+UPLOAD_POLL_TIMEOUT = 300
+# Keys a GET /jobs/{id} response must have for the progress display
+JOB_STATUS_KEYS = {"done", "total", "finished", "files"}
+
 st.set_page_config(page_title="Resume Matcher", layout="wide")
 st.title("Resume Matcher")
 
@@ -22,59 +30,89 @@ with col2:
 uploaded_files = st.file_uploader(
     "Upload Resume PDFs or DOCXs (optional)", type=['pdf', 'docx'], accept_multiple_files=True
 )
-if uploaded_files:
-    for f in uploaded_files:
-        st.write(f"Uploading {f.name}…")
-        try:
-            result = requests.post(
-                f"{BACKEND_URL}/upload_resume",
-                files={'file': (f.name, f.getvalue())}
-            )
-            if result.ok:
-                st.success(f"{f.name} uploaded!")
-            else:
-                st.error(f"Failed to upload {f.name}: {result.text}")
-        except requests.exceptions.RequestException as e:
-            st.error(f"Upload failed: {e}")
+# Streamlit reruns the script on every interaction; only send files not sent yet
+pending = [f for f in uploaded_files or [] if (f.name, f.size) not in st.session_state.setdefault("uploaded", set())]
+if pending:
+    try:
+        result = requests.post(
+            f"{BACKEND_URL}/upload_resume/batch",
+            files=[("files", (f.name, f.getvalue())) for f in pending],
+            timeout=120,
+        )
+        result.raise_for_status()
+        job_id = result.json()["job_id"]
+        st.session_state["uploaded"].update((f.name, f.size) for f in pending)
+
+        # Ingestion runs in the backend's worker pool; just report progress
+        progress = st.progress(0.0, text=f"Ingesting {len(pending)} resumes…")
+        deadline = time.time() + UPLOAD_POLL_TIMEOUT
+        job = {}
+        while time.time() < deadline:
+            resp = requests.get(f"{BACKEND_URL}/jobs/{job_id}", timeout=10)
+            status = resp.json() if resp.ok else {}
+            if not JOB_STATUS_KEYS <= status.keys():
+                st.error(f"Could not read progress of job {job_id}: HTTP {resp.status_code} {resp.text[:200]}")
+                break
+            job = status
+            progress.progress(job["done"] / max(job["total"], 1), text=f"Ingested {job['done']}/{job['total']} resumes")
+            if job["finished"]:
+                break
+            time.sleep(1)
+        else:
+            st.info(f"Still ingesting in the background (job {job_id}).")
+
+        for f in job.get("files", []):
+            if f["status"] == "ok":
+                st.success(f"{f['filename']} uploaded!")
+            elif f["status"] == "error":
+                st.error(f"Failed to upload {f['filename']}: {f['error']}")
+            elif f["status"] in ("duplicate", "near_duplicate", "skipped"):
+                st.info(f"{f['filename']}: {f['status'].replace('_', ' ')}")
+    except requests.exceptions.RequestException as e:
+        st.error(f"Upload failed: {e}")
+
+# Errors raise, so only successful responses are cached
+@st.cache_data(ttl=MATCH_CACHE_TTL, show_spinner=False)
+def fetch_matches(jd_text, top_n):
+    resp = requests.post(API_URL, json={"jd_text": jd_text, "top_n": top_n}, timeout=60)
+    resp.raise_for_status()
+    return resp.json()
 
 if st.button("Find Top Matches"):
     if not jd_text.strip():
         st.warning("Please paste a Job Description.")
     else:
-        payload = {"jd_text": jd_text, "top_n": int(top_n)}
         try:
             with st.spinner("Requesting matches from backend..."):
-                resp = requests.post(API_URL, json=payload, timeout=60)
-            if resp.status_code != 200:
-                st.error(f"Backend error {resp.status_code}: {resp.text}")
-            else:
-                data = resp.json()
-                matches = data.get("matches", [])
+                data = fetch_matches(jd_text, int(top_n))
+            matches = data.get("matches", [])
 
-                if not matches:
-                    st.info("No matches returned by backend.")
-                else:
-                    df = pd.DataFrame(matches)
+            if not matches:
+                st.info("No matches returned by backend.")
+            else:
+                df = pd.DataFrame(matches)
 
-                    sim_col = next((c for c in [
-                        "similarity_score", "similarity", "score", 
-                        "weighted_similarity", "weighted_score"
-                    ] if c in df.columns), None)
+                sim_col = next((c for c in [
+                    "similarity_score", "similarity", "score", 
+                    "weighted_similarity", "weighted_score"
+                ] if c in df.columns), None)
 
-                    if sim_col:
-                        df = df[df[sim_col] >= min_score]
-                        df = df.sort_values(by=sim_col, ascending=False).head(int(top_n))
-                        df[sim_col] = df[sim_col].round(4)
+                if sim_col:
+                    df = df[df[sim_col] >= min_score]
+                    df = df.sort_values(by=sim_col, ascending=False).head(int(top_n))
+                    df[sim_col] = df[sim_col].round(4)
 
-                    st.subheader("Top matches")
-                    st.dataframe(df, use_container_width=True)
+                st.subheader("Top matches")
+                st.dataframe(df, use_container_width=True)
 
+                st.markdown("---")
+                st.markdown("### Detailed view")
+                for i, row in df.head(int(top_n)).iterrows():
+                    st.markdown(f"**Match #{i+1}**")
+                    for col in df.columns:
+                        st.write(f"**{col}:** {row[col]}")
                     st.markdown("---")
-                    st.markdown("### Detailed view")
-                    for i, row in df.head(int(top_n)).iterrows():
-                        st.markdown(f"**Match #{i+1}**")
-                        for col in df.columns:
-                            st.write(f"**{col}:** {row[col]}")
-                        st.markdown("---")
+        except requests.exceptions.HTTPError as e:
+            st.error(f"Backend error {e.response.status_code}: {e.response.text}")
         except requests.exceptions.RequestException as e:
             st.error(f"Request to backend failed: {e}")
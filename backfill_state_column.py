@@ -1,78 +1,154 @@
-import psycopg2
-import re
-
-# Mapping of known city/region keywords to Indian states
-state_keywords = {
-    "bangalore": "karnataka",
-    "bengaluru": "karnataka",
-    "mumbai": "maharashtra",
-    "pune": "maharashtra",
-    "nagpur": "maharashtra",
-    "hyderabad": "telangana",
-    "delhi": "delhi",
-    "new delhi": "delhi",
-    "chennai": "tamil nadu",
-    "coimbatore": "tamil nadu",
-    "kolkata": "west bengal",
-    "howrah": "west bengal",
-    "noida": "uttar pradesh",
-    "ghaziabad": "uttar pradesh",
-    "lucknow": "uttar pradesh",
-    "kanpur": "uttar pradesh",
-    "patna": "bihar",
-    "bhopal": "madhya pradesh",
-    "indore": "madhya pradesh",
-    "jaipur": "rajasthan",
-    "udaipur": "rajasthan",
-    "goa": "goa",
-    "guwahati": "assam",
-    "chandigarh": "chandigarh",
-    "ranchi": "jharkhand",
-    "jamshedpur": "jharkhand",
-    "bhubaneswar": "odisha",
-    "cuttack": "odisha",
-    "amritsar": "punjab",
-    "ludhiana": "punjab",
-    "panaji": "goa"
-}
-
-def extract_state(location):
-    if not location:
-        return None
-    location = location.lower()
-    for keyword, state in state_keywords.items():
-        if re.search(rf'\b{keyword}\b', location):
-            return state
-    return None
-
-
-conn = psycopg2.connect(
-    dbname="dbresume",
-    user="postgres",
-    password="1234",
-    host="localhost",
-    port="5432"
-)
-
-cursor = conn.cursor()
-
-# Fetch all records
-cursor.execute("SELECT id, location FROM resumes")
-rows = cursor.fetchall()
-
-for resume_id, location in rows:
-    state = extract_state(location)
-    if state:
-        cursor.execute("UPDATE resumes SET state = %s WHERE id = %s", (state, resume_id))
-        print(f" Updated ID {resume_id} with state: {state}")
-    else:
-        print(f"Could not extract state for ID {resume_id}, location: {location}")
-
-conn.commit()
-cursor.close()
-conn.close()
-
-print("State backfill complete.")
-
-
-print(" State backfill complete.")
+"""Backfill resumes.state from the location column.
+
+Only rows whose state is NULL/blank or not a canonical gazetteer state are
+streamed (server-side cursor, id order). Each batch is resolved through
+gazetteer.py, written with one UPDATE ... FROM (VALUES ...) that also
+refreshes state_embedding, and committed. The last committed id is saved
+so an interrupted run resumes where it stopped; the checkpoint is removed
+once a run completes, so the next run scans every row again.
+
+    python backfill_state_column.py [--batch-size 1000] [--dry-run] [--restart]
+"""
+import os
+import json
+import time
+import argparse
+from psycopg2.extras import execute_values
+import embedding_service
+from db import get_db_connection
+from gazetteer import STATES, resolve_state, state_name
+from llm_cache import CACHE_DIR
+from result_cache import bump_corpus_generation
+from scoring import l2_normalize
+
+CHECKPOINT_PATH = os.path.join(CACHE_DIR, "state_backfill.json")
+
+STALE_PREDICATE = "(state_norm IS NULL OR state_norm = '' OR state_norm <> ALL(%(canonical)s))"
+
+SELECT_STALE = f"""
+    SELECT id, state, location
+    FROM resumes
+    WHERE id > %(last_id)s AND {STALE_PREDICATE}
+    ORDER BY id
+"""
+
+COUNT_STALE = f"SELECT COUNT(*) FROM resumes WHERE id > %(last_id)s AND {STALE_PREDICATE}"
+
+UPDATE_STATES = """
+    UPDATE resumes AS r SET state = v.state, state_embedding = v.embedding::vector
+    FROM (VALUES %s) AS v (id, state, embedding)
+    WHERE r.id = v.id
+"""
+UPDATE_TEMPLATE = "(%s, %s, %s::float4[])"
+
+def extract_state(state, location):
+    """Canonical state name for a row: its own state if the gazetteer knows
+    it, else whatever the location resolves to. None if neither does."""
+    state_id = resolve_state(state) or resolve_state(location)
+    return state_name(state_id)
+
+# ------------------- Checkpointing -------------------
+def load_checkpoint(path=CHECKPOINT_PATH):
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return json.load(f).get("last_id", 0)
+
+def save_checkpoint(last_id, path=CHECKPOINT_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"last_id": last_id}, f)
+    os.replace(tmp, path)
+
+def clear_checkpoint(path=CHECKPOINT_PATH):
+    if os.path.exists(path):
+        os.remove(path)
+
+# ------------------- Job -------------------
+class StateEmbeddings:
+    """Normalized state_embedding per state name; there are only a few dozen
+    distinct values, so each is encoded once per run."""
+
+    def __init__(self):
+        self.vectors = {}
+
+    def get_many(self, names):
+        missing = sorted({name for name in names if name not in self.vectors})
+        if missing:
+            for name, vec in zip(missing, l2_normalize(embedding_service.encode(missing))):
+                self.vectors[name] = vec.tolist()
+        return [self.vectors[name] for name in names]
+
+def _resolve_batch(rows):
+    updates, unresolved = [], 0
+    for resume_id, state, location in rows:
+        new_state = extract_state(state, location)
+        if new_state is None:
+            unresolved += 1
+        elif new_state != state:
+            updates.append((resume_id, new_state))
+    return updates, unresolved
+
+def backfill(batch_size=1000, dry_run=False, restart=False):
+    last_id = 0 if restart else load_checkpoint()
+    params = {"last_id": last_id, "canonical": list(STATES)}
+
+    read_conn, write_conn = get_db_connection(), get_db_connection()
+    with read_conn.cursor() as cur:
+        cur.execute(COUNT_STALE, params)
+        total = cur.fetchone()[0]
+    print(f"{total} rows with a missing or non-canonical state after id {last_id}"
+          f"{' (dry run)' if dry_run else ''}.")
+
+    embeddings = StateEmbeddings()
+    seen = updated = unresolved = 0
+    start = time.perf_counter()
+    # Named cursor: rows stream from the server batch_size at a time
+    with read_conn.cursor(name="state_backfill") as stream:
+        stream.itersize = batch_size
+        stream.execute(SELECT_STALE, params)
+        while True:
+            rows = stream.fetchmany(batch_size)
+            if not rows:
+                break
+            updates, batch_unresolved = _resolve_batch(rows)
+            seen += len(rows)
+            unresolved += batch_unresolved
+            updated += len(updates)
+
+            if dry_run:
+                for resume_id, new_state in updates[:3]:
+                    print(f"  would set ID {resume_id} -> {new_state}")
+            else:
+                if updates:
+                    values = [
+                        (resume_id, new_state, vec)
+                        for (resume_id, new_state), vec in zip(updates, embeddings.get_many([u[1] for u in updates]))
+                    ]
+                    with write_conn.cursor() as cur:
+                        execute_values(cur, UPDATE_STATES, values, template=UPDATE_TEMPLATE, page_size=batch_size)
+                    write_conn.commit()
+                    bump_corpus_generation()
+                save_checkpoint(rows[-1][0])
+
+            print(f"  {seen}/{total} rows, {updated} updated, {unresolved} unresolved "
+                  f"({seen / (time.perf_counter() - start):.0f} rows/s)", end="\r")
+
+    read_conn.close()
+    write_conn.close()
+    if not dry_run:
+        clear_checkpoint()
+    verb = "would be updated" if dry_run else "updated"
+    print(f"\nState backfill complete: {updated} rows {verb}, {unresolved} could not be resolved.")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="resolve and report without writing")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    args = parser.parse_args()
+    backfill(args.batch_size, args.dry_run, args.restart)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Recall@k vs latency of the pgvector ANN index on a synthetic table.
+
+Loads N clustered, L2-normalized 384-d vectors into a scratch table, builds an
+HNSW or IVFFlat index with db.create_vector_indexes, then sweeps ef_search /
+probes and compares each ANN result with an exact (index-disabled) scan.
+
+    python bench_ann.py --rows 1000000 --method hnsw --ef-search 40,100,200,400,1000
+    python bench_ann.py --rows 1000000 --method ivfflat --probes 1,10,30,100 --skip-load
+"""
+import argparse
+import io
+import time
+import numpy as np
+from db import get_db_connection, create_vector_indexes, ann_search_settings, apply_ann_settings
+from scoring import EMBEDDING_DIM, l2_normalize
+
+TABLE = "ann_bench"
+N_CLUSTERS = 1000
+LOAD_CHUNK = 50_000
+
+def synthetic_vectors(rng, centers, n):
+    labels = rng.integers(0, len(centers), n)
+    noise = rng.standard_normal((n, EMBEDDING_DIM)).astype(np.float32) * 0.35
+    return l2_normalize(centers[labels] + noise)
+
+def load_table(conn, rng, centers, rows):
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cur.execute(f"CREATE TABLE {TABLE} (id BIGSERIAL PRIMARY KEY, embedding vector({EMBEDDING_DIM}))")
+        for start in range(0, rows, LOAD_CHUNK):
+            chunk = synthetic_vectors(rng, centers, min(LOAD_CHUNK, rows - start))
+            buf = io.StringIO("".join("[" + ",".join(f"{x:.6f}" for x in vec) + "]\n" for vec in chunk))
+            cur.copy_expert(f"COPY {TABLE} (embedding) FROM STDIN", buf)
+            print(f"  loaded {start + len(chunk):,}/{rows:,} rows", end="\r")
+        cur.execute(f"ANALYZE {TABLE}")
+    conn.commit()
+    print()
+
+def search(cur, query, k):
+    cur.execute(f"SELECT id FROM {TABLE} ORDER BY embedding <-> %s::vector LIMIT %s", (query, k))
+    return [row[0] for row in cur.fetchall()]
+
+def exact_neighbors(conn, queries, k):
+    truth = []
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL enable_indexscan = off")
+        for query in queries:
+            truth.append(set(search(cur, query, k)))
+    conn.rollback()
+    return truth
+
+def sweep(conn, queries, truth, k, knob, values):
+    print(f"\n{knob:>10} | recall@{k:<3} | p50 ms | p99 ms")
+    print("-" * 42)
+    for value in values:
+        latencies, recalls = [], []
+        with conn.cursor() as cur:
+            apply_ann_settings(cur, ann_search_settings(**{knob: value}))
+            for query, expected in zip(queries, truth):
+                start = time.perf_counter()
+                found = search(cur, query, k)
+                latencies.append((time.perf_counter() - start) * 1000)
+                recalls.append(len(expected.intersection(found)) / k)
+        conn.rollback()
+        print(f"{value:>10} | {np.mean(recalls):9.3f} | {np.percentile(latencies, 50):6.2f} | "
+              f"{np.percentile(latencies, 99):6.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--method", choices=["hnsw", "ivfflat"], default="hnsw")
+    parser.add_argument("--ef-search", default="10,40,100,200,400,1000")
+    parser.add_argument("--probes", default="1,5,10,30,100")
+    parser.add_argument("--maintenance-work-mem", default="2GB")
+    parser.add_argument("--skip-load", action="store_true", help="reuse the existing table")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((N_CLUSTERS, EMBEDDING_DIM)).astype(np.float32)
+    conn = get_db_connection()
+
+    if not args.skip_load:
+        print(f"Loading {args.rows:,} synthetic vectors into {TABLE}...")
+        load_table(conn, rng, centers, args.rows)
+
+    create_vector_indexes(method=args.method, columns=["embedding"], table=TABLE,
+                          rebuild=not args.skip_load, maintenance_work_mem=args.maintenance_work_mem)
+
+    queries = synthetic_vectors(rng, centers, args.queries)
+    print(f"Computing exact top-{args.k} for {args.queries} queries...")
+    truth = exact_neighbors(conn, queries, args.k)
+
+    if args.method == "hnsw":
+        sweep(conn, queries, truth, args.k, "ef_search", [int(v) for v in args.ef_search.split(",")])
+    else:
+        sweep(conn, queries, truth, args.k, "probes", [int(v) for v in args.probes.split(",")])
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Load test for POST /match: throughput and latency at N concurrent clients.
+
+Run it against the server before and after a change (e.g. a checkout of the
+previous commit on another port) to compare:
+
+    uvicorn api:app --port 8000
+    python bench_match_load.py --url http://127.0.0.1:8000/match --concurrency 50 --requests 500
+"""
+import argparse
+import asyncio
+import time
+import httpx
+
+SAMPLE_JDS = [
+    "Machine Learning Engineer, Mumbai. Python, PyTorch, NLP, 3+ years. B.Tech in CS.",
+    "Data Scientist, Bangalore. SQL, statistics, scikit-learn, 2+ years. Masters preferred.",
+    "Backend Developer, Hyderabad. Java, Spring Boot, PostgreSQL, 4+ years.",
+    "Frontend Engineer, Pune. React, TypeScript, CSS, 2+ years.",
+    "DevOps Engineer, Delhi. Kubernetes, Terraform, AWS, 5+ years.",
+]
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+async def run(url, concurrency, total, top_n):
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def client_loop(client):
+        nonlocal errors
+        for i in counter:
+            payload = {"jd_text": SAMPLE_JDS[i % len(SAMPLE_JDS)], "top_n": top_n}
+            start = time.perf_counter()
+            try:
+                response = await client.post(url, json=payload)
+                if response.status_code not in (200, 404):
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    print(f"Requests     : {total} ({errors} errors) at concurrency {concurrency}")
+    print(f"Throughput   : {total / elapsed:.1f} req/s")
+    print(f"Latency p50  : {percentile(latencies, 50) * 1000:.0f} ms")
+    print(f"Latency p99  : {percentile(latencies, 99) * 1000:.0f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000/match")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--top-n", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.concurrency, args.requests, args.top_n))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Memory, table size and recall@10 of quantized representations.
+
+The reference is the full-precision matcher: exact weighted scoring of every
+resume with float32 vectors (read from a float32 mmap_engine snapshot). Each
+candidate is compared against it:
+
+- Postgres retrieval modes ("composite", "halfvec", "binary") followed by the
+  usual float32 re-rank of their candidate pool;
+- mmap_engine snapshots stored as float16 and int8.
+
+Query JDs are existing resumes with noise added, so no LLM calls are needed.
+
+    python mmap_engine.py rebuild          # float32 reference snapshot
+    python bench_quantization.py [--queries 100] [--k 10]
+"""
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+from db import db_connection, create_quantized_indexes, ann_search_settings, apply_ann_settings
+from matching2 import SINGLE_LIST_QUERIES, CANDIDATE_POOL, DEFAULT_EF_SEARCH, jd_composite_vector, rank_candidates
+from mmap_engine import SNAPSHOT_DIR, EmbeddingSnapshot, refresh_snapshot
+from scoring import SECTIONS, l2_normalize
+
+PG_MODES = ["composite", "halfvec", "binary"]
+
+def make_queries(reference, n, rng, noise=0.05):
+    picks = rng.choice(len(reference), size=min(n, len(reference)), replace=False)
+    vectors = reference._dequantize(np.sort(picks))
+    vectors = l2_normalize(vectors + rng.standard_normal(vectors.shape).astype(np.float32) * noise)
+    return [{section: vec[j] for j, section in enumerate(SECTIONS)} for vec in vectors]
+
+def recall(expected, found, k):
+    return len(set(expected[:k]).intersection(found[:k])) / k
+
+def report_sizes(cur):
+    cur.execute("""
+        SELECT pg_size_pretty(pg_relation_size('resumes')),
+               pg_size_pretty(pg_total_relation_size('resumes')),
+               (SELECT COUNT(*) FROM resumes)
+    """)
+    heap, total, rows = cur.fetchone()
+    print(f"resumes: {rows} rows, heap {heap}, total with TOAST + indexes {total}")
+    cur.execute("""
+        SELECT indexrelid::regclass::text, pg_size_pretty(pg_relation_size(indexrelid))
+        FROM pg_index WHERE indrelid = 'resumes'::regclass ORDER BY pg_relation_size(indexrelid) DESC
+    """)
+    for name, size in cur.fetchall():
+        print(f"  {name:<50} {size}")
+
+def all_states(cur):
+    cur.execute("SELECT DISTINCT state_norm FROM resumes WHERE state_norm IS NOT NULL")
+    return [row[0] for row in cur.fetchall()]
+
+def bench_postgres(queries, truth, states, k):
+    print(f"\n{'pg mode':<12} | recall@{k} | p50 ms")
+    print("-" * 36)
+    with db_connection() as conn, conn.cursor() as cur:
+        for mode in PG_MODES:
+            recalls, latencies = [], []
+            for jd, expected in zip(queries, truth):
+                start = time.perf_counter()
+                apply_ann_settings(cur, ann_search_settings(DEFAULT_EF_SEARCH, None, "iterative"))
+                cur.execute(SINGLE_LIST_QUERIES[mode], (states, jd_composite_vector(jd), CANDIDATE_POOL))
+                ranked = rank_candidates(jd, cur.fetchall(), k)
+                latencies.append((time.perf_counter() - start) * 1000)
+                recalls.append(recall(expected, [resume_id for resume_id, _ in ranked], k))
+            conn.rollback()
+            print(f"{mode:<12} | {np.mean(recalls):8.3f} | {np.percentile(latencies, 50):6.1f}")
+
+def bench_snapshots(queries, truth, states, k):
+    print(f"\n{'snapshot':<12} | recall@{k} | p50 ms | vectors on disk")
+    print("-" * 54)
+    for dtype in ["float16", "int8"]:
+        with tempfile.TemporaryDirectory() as path:
+            refresh_snapshot(path, dtype=dtype, rebuild=True)
+            snapshot = EmbeddingSnapshot(path)
+            recalls, latencies = [], []
+            for jd, expected in zip(queries, truth):
+                start = time.perf_counter()
+                ids, _ = snapshot.search(jd, states, k)
+                latencies.append((time.perf_counter() - start) * 1000)
+                recalls.append(recall(expected, ids.tolist(), k))
+            size = os.path.getsize(snapshot.file_path("vectors")) / 2 ** 20
+            print(f"{dtype:<12} | {np.mean(recalls):8.3f} | {np.percentile(latencies, 50):6.1f} | {size:.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--skip-index-build", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not args.skip_index_build:
+        create_quantized_indexes()
+
+    reference = EmbeddingSnapshot(SNAPSHOT_DIR)
+    if reference.meta["dtype"] != "float32":
+        raise SystemExit("The reference snapshot must be float32: python mmap_engine.py rebuild --dtype float32")
+    ref_size = os.path.getsize(reference.file_path("vectors")) / 2 ** 20
+    print(f"float32 reference snapshot: {len(reference)} rows, {ref_size:.1f} MB of vectors")
+
+    with db_connection() as conn, conn.cursor() as cur:
+        report_sizes(cur)
+        states = all_states(cur)
+
+    # Same state set everywhere so rows without a state are excluded consistently
+    queries = make_queries(reference, args.queries, np.random.default_rng(args.seed))
+    truth = [reference.search(jd, states, args.k)[0].tolist() for jd in queries]
+
+    bench_postgres(queries, truth, states, args.k)
+    bench_snapshots(queries, truth, states, args.k)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Micro-benchmark: per-request decode cost of pgvector text output.
+
+Simulates one /match request worth of rows (CANDIDATE_POOL x 4 vectors) as
+psycopg2 hands them over without a type caster, and compares the old
+ast.literal_eval path with the NumPy caster registered by db.register_vector.
+
+    python bench_vector_decode.py [--rows 300] [--repeat 5]
+"""
+import argparse
+import ast
+import time
+import numpy as np
+from db import parse_vector_text
+from scoring import EMBEDDING_DIM
+
+def make_rows(n_rows, n_vectors=4, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n_rows * n_vectors, EMBEDDING_DIM)).astype(np.float32)
+    # Same formatting as pgvector's vector_out
+    return ["[" + ",".join(f"{x:g}" for x in vec) + "]" for vec in vectors]
+
+def decode_literal_eval(values):
+    return [np.array(ast.literal_eval(v)) for v in values]
+
+def decode_caster(values):
+    return [parse_vector_text(v) for v in values]
+
+def best_of(fn, values, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(values)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    values = make_rows(args.rows)
+    assert np.allclose(decode_literal_eval(values[:1])[0], decode_caster(values[:1])[0], atol=1e-5)
+
+    before = best_of(decode_literal_eval, values, args.repeat)
+    after = best_of(decode_caster, values, args.repeat)
+    print(f"Vectors per request: {len(values)}")
+    print(f"ast.literal_eval : {before * 1000:8.2f} ms/request")
+    print(f"vector caster    : {after * 1000:8.2f} ms/request")
+    print(f"Speedup          : {before / after:8.1f}x")
+
+if __name__ == "__main__":
+    main()
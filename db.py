@@ -1,7 +1,19 @@
 import psycopg2
+from psycopg2.extensions import register_adapter, register_type, new_type, new_array_type, AsIs
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+from contextlib import contextmanager
+import numpy as np
+import threading
+import struct
+import time
 import json
 import hashlib
-from sentence_transformers import SentenceTransformer
+import embedding_service
+from result_cache import bump_corpus_generation
+from gazetteer import resolve_state, canonical_state, state_name
+from fingerprint import create_fingerprint_tables, store_fingerprints
+from scoring import SECTIONS, l2_normalize, composite_vector, weights_version
 
 DB_CONFIG = {
     "dbname": "dbresume",
@@ -11,12 +23,223 @@ DB_CONFIG = {
     "port": 5432
 }
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# --- Connection pool config ---
+POOL_MIN_CONN = 1
+POOL_MAX_CONN = 10
+POOL_TIMEOUT = 5.0                # max seconds to wait for a free connection
+POOL_HEALTHCHECK_INTERVAL = 30.0  # ping connections idle for longer than this
+ASYNC_POOL_MIN_CONN = 2
+ASYNC_POOL_MAX_CONN = 20
+
+# --- Vector index config ---
+VECTOR_INDEX_METHOD = "hnsw"      # "hnsw" or "ivfflat"
+# Only columns some retrieval query orders by; every index costs insert time
+VECTOR_INDEX_COLUMNS = [
+    "composite_embedding",
+    "job_titles_embedding",
+    "skills_embedding",
+    "experience_embedding",
+]
+# Indexes earlier versions built on columns no query searches
+RETIRED_VECTOR_INDEXES = [
+    "resumes_education_embedding_hnsw_idx",
+    "resumes_education_embedding_ivfflat_idx",
+]
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+IVFFLAT_LISTS = None              # None -> rows / 1000 (sqrt(rows) above 1M rows)
+
+# Quantized HNSW expression indexes (pgvector >= 0.7). Expressions must match
+# matching2.RETRIEVAL_ORDER_BY for the planner to use them.
+QUANTIZED_INDEX_OPS = {
+    "halfvec": ("({column}::halfvec(384))", "halfvec_l2_ops"),
+    "binary": ("(binary_quantize({column})::bit(384))", "bit_hamming_ops"),
+}
+
+# --- Filtered search (pgvector >= 0.8 for iterative scans) ---
+SEARCH_MODES = ("auto", "iterative", "exact", "ann")
+ITERATIVE_MAX_SCAN_TUPLES = 100_000   # HNSW tuples visited before giving up
+ITERATIVE_MAX_PROBES = 1000           # IVFFlat lists probed before giving up
+
+# ------------------- pgvector <-> NumPy -------------------
+def parse_vector_text(value):
+    """Parse pgvector's text output ('[0.1,0.2,...]') into a float32 array.
+
+    np.fromstring does the float parsing in C, so there is no Python-level
+    literal_eval of every element.
+    """
+    return np.fromstring(value[1:-1], sep=",", dtype=np.float32)
+
+def _cast_vector(value, cur):
+    if value is None:
+        return None
+    return parse_vector_text(value)
+
+def _adapt_ndarray(arr):
+    return AsIs("'[" + ",".join(map(repr, np.asarray(arr, dtype=np.float32).tolist())) + "]'")
+
+register_adapter(np.ndarray, _adapt_ndarray)
+
+_vector_oids = None
+
+def register_vector(conn):
+    """Make vector columns arrive on ``conn`` as NumPy float32 arrays."""
+    global _vector_oids
+    if _vector_oids is None:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 'vector'::regtype::oid, 'vector[]'::regtype::oid")
+            _vector_oids = cur.fetchone()
+        # The lookup opened a transaction; leave the connection idle again
+        conn.rollback()
+    oid, array_oid = _vector_oids
+    vector_type = new_type((oid,), "VECTOR", _cast_vector)
+    register_type(vector_type, conn)
+    register_type(new_array_type((array_oid,), "VECTOR[]", vector_type), conn)
+    return conn
 
 def get_db_connection():
-    return psycopg2.connect(**DB_CONFIG)
+    return register_vector(psycopg2.connect(**DB_CONFIG))
+
+# ------------------- Connection pool -------------------
+class PoolTimeout(PoolError):
+    pass
+
+class _VectorConnectionPool(ThreadedConnectionPool):
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        register_vector(conn)
+        return conn
+
+class BoundedConnectionPool:
+    """Thread-safe pool that waits up to ``timeout`` seconds for a connection
+    instead of failing immediately, and pings connections that sat idle."""
+
+    def __init__(self, minconn, maxconn, timeout=POOL_TIMEOUT,
+                 healthcheck_interval=POOL_HEALTHCHECK_INTERVAL, **config):
+        self.timeout = timeout
+        self.healthcheck_interval = healthcheck_interval
+        self._pool = _VectorConnectionPool(minconn, maxconn, **config)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used = {}
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        if time.monotonic() - self._last_used.get(id(conn), 0) < self.healthcheck_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"No database connection available within {self.timeout}s")
+        try:
+            conn = self._pool.getconn()
+            if not self._is_healthy(conn):
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn):
+        close = conn.closed != 0
+        if not close and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                close = True
+        self._last_used[id(conn)] = time.monotonic()
+        self._pool.putconn(conn, close=close)
+        self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def init_pool(minconn=POOL_MIN_CONN, maxconn=POOL_MAX_CONN, timeout=POOL_TIMEOUT):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BoundedConnectionPool(minconn, maxconn, timeout=timeout, **DB_CONFIG)
+    return _pool
 
-def create_updated_table():
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+@contextmanager
+def db_connection():
+    """Borrow a connection from the shared pool (created on first use)."""
+    pool = _pool or init_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
+
+# ------------------- Async pool (asyncpg) -------------------
+def _decode_vector_binary(data):
+    # pgvector binary format: int16 dim, int16 unused, dim x float4 (big-endian)
+    (dim,) = struct.unpack_from(">H", data)
+    return np.frombuffer(data, dtype=">f4", count=dim, offset=4).astype(np.float32)
+
+def _encode_vector_binary(vec):
+    arr = np.asarray(vec, dtype=">f4")
+    return struct.pack(">HH", arr.shape[0], 0) + arr.tobytes()
+
+async def _init_async_connection(conn):
+    await conn.set_type_codec(
+        "vector", schema="public", format="binary",
+        encoder=_encode_vector_binary, decoder=_decode_vector_binary,
+    )
+    # Match psycopg2, which returns JSONB as Python objects
+    await conn.set_type_codec("jsonb", schema="pg_catalog", encoder=json.dumps, decoder=json.loads)
+
+_async_pool = None
+
+async def init_async_pool(min_size=ASYNC_POOL_MIN_CONN, max_size=ASYNC_POOL_MAX_CONN, timeout=POOL_TIMEOUT):
+    global _async_pool
+    if _async_pool is None:
+        import asyncpg
+
+        _async_pool = await asyncpg.create_pool(
+            database=DB_CONFIG["dbname"],
+            user=DB_CONFIG["user"],
+            password=DB_CONFIG["password"],
+            host=DB_CONFIG["host"],
+            port=DB_CONFIG["port"],
+            min_size=min_size,
+            max_size=max_size,
+            timeout=timeout,
+            init=_init_async_connection,
+        )
+    return _async_pool
+
+async def close_async_pool():
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.close()
+        _async_pool = None
+
+async def get_async_pool():
+    return _async_pool or await init_async_pool()
+
+def create_updated_table(vector_indexes=True):
+    """Create or upgrade the schema. Bulk writers pass ``vector_indexes=False``
+    and call create_vector_indexes once their rows are in, so the HNSW graphs
+    are built once instead of maintained row by row."""
     conn = get_db_connection()
 
     with conn.cursor() as cur:
@@ -36,11 +259,17 @@ def create_updated_table():
                 experience_embedding vector(384),
                 education_embedding vector(384),
                 job_titles_embedding vector(384),
-                state_embedding vector(384)
+                state_embedding vector(384),
+                composite_embedding vector(384),
+                embedding_version TEXT
             );
         """)
         print("✓ Ensured resumes table exists.")
 
+        # Columns added after the original schema
+        cur.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS composite_embedding vector(384)")
+        cur.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS embedding_version TEXT")
+
         for column in ['inline_resume', 'embedding']:
             cur.execute(f"""
                 SELECT column_name FROM information_schema.columns 
@@ -50,52 +279,149 @@ def create_updated_table():
                 cur.execute(f"ALTER TABLE resumes DROP COLUMN {column}")
                 print(f"✓ Removed old column: {column}")
 
+        # Canonical state for filtering; a plain index on it replaces LOWER(state)
+        cur.execute("""
+            ALTER TABLE resumes
+            ADD COLUMN IF NOT EXISTS state_norm TEXT
+            GENERATED ALWAYS AS (LOWER(BTRIM(state))) STORED
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS resumes_state_norm_idx ON resumes (state_norm)")
+        print("✓ Ensured state_norm column and index.")
+
+        create_fingerprint_tables(cur)
+
+        for index_name in RETIRED_VECTOR_INDEXES:
+            cur.execute(f"DROP INDEX IF EXISTS {index_name}")
+
     conn.commit()
     conn.close()
 
-# Mapping cities to states
-CITY_TO_STATE = {
-    "mumbai": "Maharashtra",
-    "delhi": "Delhi",
-    "bangalore": "Karnataka",
-    "chennai": "Tamil Nadu",
-    "hyderabad": "Telangana",
-    "kolkata": "West Bengal",
-    "pune": "Maharashtra",
-    "ahmedabad": "Gujarat",
-    "jaipur": "Rajasthan",
-    "lucknow": "Uttar Pradesh",
-    "bhopal": "Madhya Pradesh",
-    "indore": "Madhya Pradesh",
-    "patna": "Bihar",
-    "surat": "Gujarat",
-    "nagpur": "Maharashtra",
-    "coimbatore": "Tamil Nadu",
-    "kochi": "Kerala",
-    "visakhapatnam": "Andhra Pradesh",
-    "chandigarh": "Chandigarh",
-    "noida": "Uttar Pradesh",
-    "gurgaon": "Haryana"
-}
+    if vector_indexes:
+        create_vector_indexes()
+
+# ------------------- Vector indexes -------------------
+def _ivfflat_lists(cur, table):
+    cur.execute(f"SELECT GREATEST(reltuples::bigint, 0) FROM pg_class WHERE oid = '{table}'::regclass")
+    rows = cur.fetchone()[0]
+    if rows > 1_000_000:
+        return max(int(rows ** 0.5), 1)
+    return max(rows // 1000, 1)
+
+def create_vector_indexes(method=VECTOR_INDEX_METHOD, columns=VECTOR_INDEX_COLUMNS, table="resumes",
+                          m=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION, lists=IVFFLAT_LISTS,
+                          rebuild=False, concurrently=False, maintenance_work_mem=None):
+    """Build L2 ANN indexes (HNSW or IVFFlat) on the embedding columns.
+
+    Indexes are named ``{table}_{column}_{method}_idx``; existing ones are kept
+    unless ``rebuild`` is set. IVFFlat should be built after the table is
+    loaded since its lists are trained on the current rows.
+    """
+    if method not in ("hnsw", "ivfflat"):
+        raise ValueError(f"Unsupported vector index method: {method}")
+
+    conn = get_db_connection()
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            if maintenance_work_mem:
+                cur.execute("SELECT set_config('maintenance_work_mem', %s, false)", (maintenance_work_mem,))
+            if method == "hnsw":
+                options = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+            else:
+                options = f"lists = {int(lists or _ivfflat_lists(cur, table))}"
+
+            for column in columns:
+                index_name = f"{table}_{column}_{method}_idx"
+                if rebuild:
+                    cur.execute(f"DROP INDEX IF EXISTS {index_name}")
+                start = time.perf_counter()
+                cur.execute(f"""
+                    CREATE INDEX {"CONCURRENTLY" if concurrently else ""} IF NOT EXISTS {index_name}
+                    ON {table} USING {method} ({column} vector_l2_ops)
+                    WITH ({options})
+                """)
+                print(f"✓ Ensured {method} index {index_name} ({time.perf_counter() - start:.1f}s)")
+    finally:
+        conn.close()
+
+def create_quantized_indexes(kinds=("halfvec", "binary"), column="composite_embedding", table="resumes",
+                             m=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION, rebuild=False, concurrently=False):
+    """Build half-precision and/or binary-quantized HNSW indexes over ``column``.
+
+    Half precision halves index memory; binary cuts it ~32x at a recall cost
+    that the float32 re-rank in matching2 recovers.
+    """
+    conn = get_db_connection()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            for kind in kinds:
+                expression, opclass = QUANTIZED_INDEX_OPS[kind]
+                index_name = f"{table}_{column}_{kind}_idx"
+                if rebuild:
+                    cur.execute(f"DROP INDEX IF EXISTS {index_name}")
+                start = time.perf_counter()
+                cur.execute(f"""
+                    CREATE INDEX {"CONCURRENTLY" if concurrently else ""} IF NOT EXISTS {index_name}
+                    ON {table} USING hnsw ({expression.format(column=column)} {opclass})
+                    WITH (m = {int(m)}, ef_construction = {int(ef_construction)})
+                """)
+                print(f"✓ Ensured {kind} index {index_name} ({time.perf_counter() - start:.1f}s)")
+    finally:
+        conn.close()
+
+def ann_search_settings(ef_search=None, probes=None, search_mode=None):
+    """(name, value) pairs for per-query ANN tuning.
+
+    ``ef_search`` (HNSW) and ``probes`` (IVFFlat) trade recall for latency.
+    ``search_mode`` controls how filtered queries use the index:
+
+    - "ann": plain index scan; a WHERE filter is applied afterwards, so
+      selective filters can return fewer rows than the LIMIT.
+    - "iterative": the index scan keeps going until LIMIT rows pass the filter.
+    - "exact": skip the vector index, use the state_norm index and sort exactly.
+    """
+    settings = []
+    if ef_search is not None:
+        settings.append(("hnsw.ef_search", str(int(ef_search))))
+    if probes is not None:
+        settings.append(("ivfflat.probes", str(int(probes))))
+    if search_mode == "iterative":
+        settings.extend([
+            ("hnsw.iterative_scan", "relaxed_order"),
+            ("hnsw.max_scan_tuples", str(ITERATIVE_MAX_SCAN_TUPLES)),
+            ("ivfflat.iterative_scan", "relaxed_order"),
+            ("ivfflat.max_probes", str(ITERATIVE_MAX_PROBES)),
+        ])
+    elif search_mode == "exact":
+        settings.append(("enable_indexscan", "off"))
+    elif search_mode not in (None, "ann"):
+        raise ValueError(f"Unsupported search mode: {search_mode}")
+    return settings
+
+def apply_ann_settings(cur, settings):
+    """SET LOCAL each setting; only lasts until the current transaction ends."""
+    for name, value in settings:
+        cur.execute("SELECT set_config(%s, %s, true)", (name, value))
+
+async def apply_ann_settings_async(conn, settings):
+    for name, value in settings:
+        await conn.execute("SELECT set_config($1, $2, true)", name, value)
 
 def infer_state_from_location(location):
-    if not location:
-        return None
-    location = location.lower()
-    for city, state in CITY_TO_STATE.items():
-        if city in location:
-            return state
-    return None
+    return state_name(resolve_state(location))
+
+EMBEDDING_SECTIONS = ["skills", "experience", "education", "job_titles", "state"]
 
-def insert_resume_into_db(conn, structured_info):
+def compute_resume_hash(structured_info):
     resume_content = json.dumps(structured_info, sort_keys=True)
-    resume_hash = hashlib.md5(resume_content.encode()).hexdigest()
+    return hashlib.md5(resume_content.encode()).hexdigest()
 
-    with conn.cursor() as cur:
-        cur.execute("SELECT id FROM resumes WHERE resume_hash = %s", (resume_hash,))
-        if cur.fetchone():
-            print(f"Resume with hash {resume_hash[:8]}... already exists. Skipping.")
-            return False
+def fill_missing_state(structured_info):
+    # Store the gazetteer's spelling so state_norm matches the filter ids
+    if structured_info.get("state"):
+        structured_info["state"] = state_name(canonical_state(structured_info["state"]))
 
     #  Infer missing state from location
     if not structured_info.get("state"):
@@ -106,57 +432,186 @@ def insert_resume_into_db(conn, structured_info):
         else:
             print(f"Could not infer state from location: {structured_info.get('location')}")
 
-    embeddings = {}
+def build_section_texts(structured_info):
+    skills_text = ", ".join(structured_info.get("skills") or [])
 
-    skills_text = ", ".join(structured_info.get("skills", []))
-    embeddings["skills"] = model.encode(skills_text).tolist()
-
-    experience_items = structured_info.get("experience", [])
+    experience_items = structured_info.get("experience") or []
     experience_text = " ".join(
         f"{e.get('title', '')} at {e.get('company', '')} - {e.get('description', '')}" for e in experience_items
     )
-    embeddings["experience"] = model.encode(experience_text).tolist()
 
-    education_items = structured_info.get("education", [])
+    education_items = structured_info.get("education") or []
     education_text = " ".join(
         f"{e.get('degree', '')} in {e.get('field', '')} from {e.get('institution', '')}" for e in education_items
     )
-    embeddings["education"] = model.encode(education_text).tolist()
 
     job_titles_text = f"{structured_info.get('current_job_title', '')} {structured_info.get('preferred_job_title', '')}"
-    embeddings["job_titles"] = model.encode(job_titles_text.strip()).tolist()
 
-    state_text = structured_info.get("state", "")
-    embeddings["state"] = model.encode(state_text).tolist()
+    return [
+        skills_text,
+        experience_text,
+        education_text,
+        job_titles_text.strip(),
+        structured_info.get("state") or "",
+    ]
+
+def section_embeddings_to_row_vectors(vectors):
+    """Normalize an (N, len(EMBEDDING_SECTIONS), D) array and add the weighted
+    composite. Returns one dict per resume, section -> embedding list."""
+    vectors = l2_normalize(vectors)
+    scoring_idx = [EMBEDDING_SECTIONS.index(section) for section in SECTIONS]
+    composites = composite_vector(vectors[:, scoring_idx])
+    rows = []
+    for per_resume, composite in zip(vectors, composites):
+        row = {section: per_resume[j].tolist() for j, section in enumerate(EMBEDDING_SECTIONS)}
+        row["composite"] = composite.tolist()
+        rows.append(row)
+    return rows
+
+def embed_resumes(structured_infos, batch_size=embedding_service.DEFAULT_BATCH_SIZE):
+    """Encode every section of every resume in a single batched forward pass.
+
+    Vectors are stored L2-normalized alongside a SECTION_WEIGHTS composite.
+    Returns one dict per resume mapping section name -> embedding list.
+    """
+    texts = []
+    for info in structured_infos:
+        texts.extend(build_section_texts(info))
+    if not texts:
+        return []
+
+    vectors = embedding_service.encode(texts, batch_size=batch_size)
+    return section_embeddings_to_row_vectors(
+        vectors.reshape(len(structured_infos), len(EMBEDDING_SECTIONS), -1)
+    )
+
+def _resume_row(structured_info, resume_hash, embeddings):
+    return (
+        structured_info.get("name"),
+        structured_info.get("location"),
+        structured_info.get("state"),
+        structured_info.get("current_job_title"),
+        structured_info.get("preferred_job_title"),
+        structured_info.get("skills") or [],
+        json.dumps(structured_info.get("experience") or []),
+        json.dumps(structured_info.get("education") or []),
+        resume_hash,
+        embeddings["skills"],
+        embeddings["experience"],
+        embeddings["education"],
+        embeddings["job_titles"],
+        embeddings["state"],
+        embeddings["composite"],
+        weights_version()
+    )
+
+INSERT_RESUME_COLUMNS = """
+    name, location, state, current_job_title, preferred_job_title,
+    skills, experience, education, resume_hash,
+    skills_embedding, experience_embedding, education_embedding,
+    job_titles_embedding, state_embedding,
+    composite_embedding, embedding_version
+"""
+
+def insert_resume_into_db(conn, structured_info, fingerprint=None):
+    """Insert one resume; ``fingerprint`` (fingerprint.Fingerprint) is recorded
+    against the new row, or against the existing one when the structured
+    hash already exists, so the same file short-circuits next time."""
+    resume_hash = compute_resume_hash(structured_info)
 
     with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO resumes (
-                name, location, state, current_job_title, preferred_job_title,
-                skills, experience, education, resume_hash,
-                skills_embedding, experience_embedding, education_embedding,
-                job_titles_embedding, state_embedding
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (
-            structured_info.get("name"),
-            structured_info.get("location"),
-            structured_info.get("state"),
-            structured_info.get("current_job_title"),
-            structured_info.get("preferred_job_title"),
-            structured_info.get("skills") or [],
-            json.dumps(structured_info.get("experience") or []),
-            json.dumps(structured_info.get("education") or []),
-            resume_hash,
-            embeddings["skills"],
-            embeddings["experience"],
-            embeddings["education"],
-            embeddings["job_titles"],
-            embeddings["state"]
-        ))
+        cur.execute("SELECT id FROM resumes WHERE resume_hash = %s", (resume_hash,))
+        existing = cur.fetchone()
+        if existing:
+            print(f"Resume with hash {resume_hash[:8]}... already exists. Skipping.")
+            if fingerprint is not None:
+                store_fingerprints(cur, [(existing[0], fingerprint)])
+                conn.commit()
+            return False
+
+    fill_missing_state(structured_info)
+    embeddings = embed_resumes([structured_info])[0]
+
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            INSERT INTO resumes ({INSERT_RESUME_COLUMNS})
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            RETURNING id
+        """, _resume_row(structured_info, resume_hash, embeddings))
+        store_fingerprints(cur, [(cur.fetchone()[0], fingerprint)])
 
     conn.commit()
+    bump_corpus_generation()
     print("Inserted resume into database.")
     return True
+
+def insert_resumes_into_db(conn, structured_infos, page_size=500, fingerprints=None):
+    """Bulk variant of insert_resume_into_db.
+
+    Hashes are checked against the table in one query, all sections of the new
+    resumes are embedded in one batch and the rows are written with a single
+    multi-row INSERT. ``fingerprints`` is an optional list aligned with the
+    input. Returns a list of booleans (inserted / skipped) aligned with the
+    input.
+    """
+    structured_infos = list(structured_infos)
+    fingerprints = list(fingerprints) if fingerprints is not None else [None] * len(structured_infos)
+    hashes = [compute_resume_hash(info) for info in structured_infos]
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT resume_hash, id FROM resumes WHERE resume_hash = ANY(%s)", (list(set(hashes)),))
+        existing = dict(cur.fetchall())
+
+    results = [False] * len(structured_infos)
+    pending = []
+    known = []
+    for position, (info, resume_hash, fingerprint) in enumerate(zip(structured_infos, hashes, fingerprints)):
+        if resume_hash in existing:
+            if existing[resume_hash] is not None:
+                known.append((existing[resume_hash], fingerprint))
+            continue
+        # Also dedupe within the batch itself
+        existing[resume_hash] = None
+        fill_missing_state(info)
+        pending.append((position, info, resume_hash, fingerprint))
+
+    if not pending:
+        with conn.cursor() as cur:
+            store_fingerprints(cur, known)
+        conn.commit()
+        print(f"All {len(structured_infos)} resumes already exist. Skipping.")
+        return results
+
+    embeddings = embed_resumes([info for _, info, _, _ in pending])
+    rows = [
+        _resume_row(info, resume_hash, emb)
+        for (_, info, resume_hash, _), emb in zip(pending, embeddings)
+    ]
+
+    with conn.cursor() as cur:
+        inserted = execute_values(
+            cur,
+            f"INSERT INTO resumes ({INSERT_RESUME_COLUMNS}) VALUES %s ON CONFLICT (resume_hash) DO NOTHING "
+            "RETURNING resume_hash, id",
+            rows,
+            page_size=page_size,
+            fetch=True,
+        )
+        # Rows skipped by ON CONFLICT (a concurrent ingest of the same
+        # resume) are missing from RETURNING and count as not inserted
+        ids = dict(inserted)
+        store_fingerprints(cur, known + [
+            (ids[resume_hash], fingerprint) for _, _, resume_hash, fingerprint in pending if resume_hash in ids
+        ])
+
+    conn.commit()
+    for position, _, resume_hash, _ in pending:
+        results[position] = resume_hash in ids
+    if ids:
+        bump_corpus_generation()
+    print(f"Inserted {len(ids)} resumes into database ({len(structured_infos) - len(ids)} skipped).")
+    return results
+
 def fetch_resumes_from_db():
     conn = get_db_connection()
     resumes = []
@@ -0,0 +1,63 @@
+import asyncio
+import threading
+import time
+import resource
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+DEFAULT_BATCH_SIZE = 64
+# Threads for encode_async; keeps CPU-bound inference off the event loop
+ENCODE_WORKERS = 2
+
+_model = None
+_model_lock = threading.Lock()
+_executor = None
+
+def _rss_mb():
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def get_model():
+    """Return the process-wide SentenceTransformer, loading it on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                # Imported here so scripts that never embed skip the torch import too
+                from sentence_transformers import SentenceTransformer
+
+                rss_before = _rss_mb()
+                start = time.perf_counter()
+                _model = SentenceTransformer(MODEL_NAME)
+                print(
+                    f"Loaded embedding model {MODEL_NAME} in {time.perf_counter() - start:.2f}s "
+                    f"(peak RSS {rss_before:.0f} -> {_rss_mb():.0f} MB)"
+                )
+    return _model
+
+def encode(texts, batch_size=DEFAULT_BATCH_SIZE):
+    """Encode a string or list of strings into float32 embeddings.
+
+    A single string returns a (D,) array, a list returns an (N, D) array.
+    """
+    single = isinstance(texts, str)
+    vectors = get_model().encode([texts] if single else list(texts), batch_size=batch_size)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors[0] if single else vectors
+
+def _get_executor():
+    global _executor
+    with _model_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=ENCODE_WORKERS, thread_name_prefix="encode")
+    return _executor
+
+async def encode_async(texts, batch_size=DEFAULT_BATCH_SIZE):
+    """encode() on the dedicated, bounded encoder thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), encode, texts, batch_size)
+
+def warmup():
+    """Load the model and run one tiny forward pass (e.g. at API startup)."""
+    encode(["warmup"])
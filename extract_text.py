@@ -1,26 +1,174 @@
 import os
 import io
+import resource
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import pdfplumber
 from docx import Document
 
-def extract_text_from_pdf(file_obj):
-    text = ""
-    with pdfplumber.open(file_obj) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-    return text.strip()
+try:
+    import pypdfium2 as pdfium  # fast text-layer backend; pdfplumber is the fallback
+except ImportError:
+    pdfium = None
 
-def extract_text_from_docx(file_obj):
+# Formats extract_text can read
+SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+
+# --- Extraction tuning ---
+# Documents with at least this many pages are split across the PAGE_WORKERS
+# processes of a shared, long-lived pool when extracted in full (budgeted
+# extraction reads pages in order and stops early instead). Shorter documents
+# extract faster serially than the chunks can be shipped to the workers.
+PARALLEL_PAGE_THRESHOLD = 200
+PAGE_WORKERS = min(4, os.cpu_count() or 1)
+# Fast-backend output shorter than this is treated as a failed layout and
+# re-extracted with pdfplumber
+MIN_TEXT_LAYER_CHARS = 50
+# Per-file limits, applied by extract_text_limited (one child per file, for
+# API uploads) and by ExtractionPool workers (bulk ingest)
+EXTRACT_TIMEOUT = 60            # seconds
+EXTRACT_MEMORY_MB = 1024        # data segment growth allowed per extraction process
+EXTRACT_TASKS_PER_CHILD = 100   # pool workers are replaced after this many files
+
+# forkserver children start from a clean single-threaded process, so they are
+# safe to create from the threaded API server
+_mp = multiprocessing.get_context("forkserver" if os.name == "posix" else "spawn")
+
+class ExtractionError(Exception):
+    pass
+
+class UnsupportedFormatError(ValueError):
+    pass
+
+# ------------------- PDF backends -------------------
+def _pdf_source(file_obj):
+    # A path or the raw bytes; both backends and worker processes accept either
+    if isinstance(file_obj, (str, bytes)):
+        return file_obj
+    return file_obj.read()
+
+def _open_plumber(source):
+    return pdfplumber.open(source if isinstance(source, str) else io.BytesIO(source))
+
+def _pdfium_pages(source, start=0, stop=None):
+    pdf = pdfium.PdfDocument(source)
+    try:
+        stop = len(pdf) if stop is None else min(stop, len(pdf))
+        for i in range(start, stop):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                yield textpage.get_text_range()
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        pdf.close()
+
+def _plumber_pages(source, start=0, stop=None):
+    with _open_plumber(source) as pdf:
+        for page in pdf.pages[start:stop]:
+            yield page.extract_text() or ""
+
+PDF_BACKENDS = {"pdfium": _pdfium_pages, "pdfplumber": _plumber_pages}
+
+def _page_count(backend, source):
+    if backend == "pdfium":
+        pdf = pdfium.PdfDocument(source)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    with _open_plumber(source) as pdf:
+        return len(pdf.pages)
+
+def _collect(pages, char_budget=None):
+    """Join page texts, stopping after the page that reaches ``char_budget``."""
+    parts, total = [], 0
+    try:
+        for text in pages:
+            if text:
+                parts.append(text)
+                total += len(text) + 1
+            if char_budget is not None and total >= char_budget:
+                break
+    finally:
+        pages.close()
+    return "\n".join(parts).strip()
+
+def _page_range_texts(backend, source, start, stop):
+    # Raw page texts; the parent joins them with _collect so the result is
+    # identical to a serial extraction
+    return list(PDF_BACKENDS[backend](source, start, stop))
+
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+def _get_page_pool():
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(max_workers=PAGE_WORKERS, mp_context=_mp)
+        return _page_pool
+
+def _reset_page_pool(pool):
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is pool:
+            _page_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _extract_pdf(backend, source, char_budget, page_workers):
+    parallel = char_budget is None and page_workers > 1
+    n_pages = _page_count(backend, source) if parallel else 0
+    if n_pages < PARALLEL_PAGE_THRESHOLD:
+        return _collect(PDF_BACKENDS[backend](source), char_budget)
+
+    step = -(-n_pages // min(page_workers, PAGE_WORKERS))
+    starts = list(range(0, n_pages, step))
+    pool = _get_page_pool()
+    try:
+        chunks = list(pool.map(_page_range_texts, [backend] * len(starts), [source] * len(starts),
+                               starts, [start + step for start in starts]))
+    except BrokenProcessPool:
+        # A worker died (e.g. a crash inside the PDF library); start a fresh
+        # pool next time and let the caller fall back
+        _reset_page_pool(pool)
+        raise
+    return _collect(text for chunk in chunks for text in chunk)
+
+def extract_text_from_pdf(file_obj, char_budget=None, page_workers=1):
+    source = _pdf_source(file_obj)
+    if pdfium is not None:
+        try:
+            text = _extract_pdf("pdfium", source, char_budget, page_workers)
+            if len(text) >= MIN_TEXT_LAYER_CHARS:
+                return text
+        except Exception as e:
+            print(f"pdfium extraction failed ({e}); falling back to pdfplumber.")
+    return _extract_pdf("pdfplumber", source, char_budget, page_workers)
+
+def extract_text_from_docx(file_obj, char_budget=None):
     doc = Document(file_obj)
-    return "\n".join([para.text for para in doc.paragraphs]).strip()
+    parts, total = [], 0
+    for para in doc.paragraphs:
+        parts.append(para.text)
+        total += len(para.text) + 1
+        if char_budget is not None and total >= char_budget:
+            break
+    return "\n".join(parts).strip()
 
-def extract_text(*args):
+def extract_text(*args, char_budget=None, page_workers=PAGE_WORKERS):
     """
     Flexible extract_text:
     - extract_text(path)
     - extract_text(file_bytes, filename)
+
+    With ``char_budget`` set, extraction stops once that many characters have
+    been collected (at page / paragraph granularity).
     """
     # Handle extract_text(path)
     if len(args) == 1 and isinstance(args[0], str):
@@ -29,27 +177,205 @@ def extract_text(*args):
             raise FileNotFoundError(f"File not found: {path}")
         ext = os.path.splitext(path)[1].lower()
         if ext == ".pdf":
-            with open(path, "rb") as f:
-                return extract_text_from_pdf(f)
+            return extract_text_from_pdf(path, char_budget, page_workers)
         elif ext == ".docx":
             with open(path, "rb") as f:
-                return extract_text_from_docx(f)
+                return extract_text_from_docx(f, char_budget)
         else:
-            raise ValueError(f"Unsupported file format: '{ext}' — only .pdf and .docx are supported.")
+            raise UnsupportedFormatError(f"Unsupported file format: '{ext}' — only .pdf and .docx are supported.")
 
     # Handle extract_text(file_bytes, filename)
     elif len(args) == 2:
         file_content, filename = args
         ext = os.path.splitext(filename)[1].lower()
-        file_obj = io.BytesIO(file_content)
         if ext == ".pdf":
-            return extract_text_from_pdf(file_obj)
+            return extract_text_from_pdf(file_content, char_budget, page_workers)
         elif ext == ".docx":
-            return extract_text_from_docx(file_obj)
+            return extract_text_from_docx(io.BytesIO(file_content), char_budget)
         else:
-            raise ValueError(f"Unsupported file format: '{ext}' — only .pdf and .docx are supported.")
+            raise UnsupportedFormatError(f"Unsupported file format: '{ext}' — only .pdf and .docx are supported.")
 
     else:
         raise TypeError("extract_text() must be called with either (path) or (file_bytes, filename)")
 
+# ------------------- Limits -------------------
+def _data_segment_bytes():
+    # VmData of this process; 0 where /proc is unavailable
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmData:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+def limit_memory(memory_mb=EXTRACT_MEMORY_MB):
+    """Let this process's heap and anonymous mappings grow by at most
+    ``memory_mb`` past their current size. RLIMIT_DATA is used rather than
+    RLIMIT_AS, which also counts the address space that modules preloaded
+    into the process (numpy/OpenBLAS, psycopg2) reserve without using."""
+    if not memory_mb:
+        return
+    limit = _data_segment_bytes() + memory_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_DATA)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_DATA, (limit, hard))
+
+# ------------------- Bulk extraction pool -------------------
+def _pool_worker(conn, memory_mb):
+    limit_memory(memory_mb)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        fn, args = task
+        try:
+            conn.send(("ok", fn(*args)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+    conn.close()
+
+class ExtractionPool:
+    """Process pool for bulk extraction, one supervising thread per worker.
+
+    The timeout is enforced from the parent: a worker that has not answered
+    within ``timeout`` seconds (e.g. stuck inside a pdfium or pdfminer C call,
+    where no signal can reach it) is killed and replaced, and its future fails
+    with ExtractionError, so callers waiting on the futures never hang.
+    Workers are memory-capped at start-up and replaced after
+    ``tasks_per_child`` tasks. ``submit`` returns a concurrent.futures.Future.
+    """
+
+    def __init__(self, max_workers, timeout=EXTRACT_TIMEOUT, memory_mb=EXTRACT_MEMORY_MB,
+                 tasks_per_child=EXTRACT_TASKS_PER_CHILD):
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.tasks_per_child = tasks_per_child
+        self._tasks = queue.Queue()
+        self._threads = [threading.Thread(target=self._serve, daemon=True) for _ in range(max_workers)]
+        for thread in self._threads:
+            thread.start()
 
+    def submit(self, fn, *args):
+        future = Future()
+        self._tasks.put((future, fn, args))
+        return future
+
+    def _start_worker(self):
+        conn, child_conn = _mp.Pipe()
+        proc = _mp.Process(target=_pool_worker, args=(child_conn, self.memory_mb), daemon=True)
+        proc.start()
+        child_conn.close()
+        return proc, conn
+
+    @staticmethod
+    def _stop_worker(proc, conn, kill=False):
+        if proc is None:
+            return
+        if not kill:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+            proc.join(5)
+        if proc.is_alive():
+            proc.kill()
+        proc.join()
+        conn.close()
+
+    def _serve(self):
+        proc = conn = None
+        served = 0
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+                future, fn, args = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    if proc is None or served >= self.tasks_per_child:
+                        self._stop_worker(proc, conn)
+                        proc = conn = None
+                        proc, conn = self._start_worker()
+                        served = 0
+                    served += 1
+                    conn.send((fn, args))
+                    if not conn.poll(self.timeout):
+                        raise ExtractionError(f"Text extraction exceeded {self.timeout}s")
+                    status, payload = conn.recv()
+                except Exception as e:
+                    # Timed out, died (EOF) or could not be started: the
+                    # worker is discarded and the next task gets a fresh one
+                    self._stop_worker(proc, conn, kill=True)
+                    proc = conn = None
+                    if isinstance(e, EOFError):
+                        e = ExtractionError("Text extraction process died (likely over the memory limit)")
+                    future.set_exception(e)
+                    continue
+                if status == "ok":
+                    future.set_result(payload)
+                else:
+                    future.set_exception(ExtractionError(payload))
+        finally:
+            self._stop_worker(proc, conn)
+
+    def shutdown(self, wait=True):
+        # Queued tasks are still run; each thread exits at its sentinel
+        for _ in self._threads:
+            self._tasks.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+# ------------------- Isolated extraction -------------------
+def _extract_in_child(conn, args, char_budget, memory_mb):
+    limit_memory(memory_mb)
+    try:
+        conn.send(("ok", extract_text(*args, char_budget=char_budget, page_workers=1)))
+    except UnsupportedFormatError as e:
+        conn.send(("unsupported", str(e)))
+    except BaseException as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+def extract_text_limited(*args, char_budget=None, timeout=EXTRACT_TIMEOUT, memory_mb=EXTRACT_MEMORY_MB):
+    """extract_text in a child process with a wall-clock ``timeout`` and a
+    ``memory_mb`` cap, so a hostile or huge file cannot stall or exhaust the
+    caller. Raises ExtractionError when a limit is hit. Starting the child
+    costs far more than a budgeted extraction, so bulk ingest uses
+    ExtractionPool instead.
+    """
+    receiver, sender = _mp.Pipe(duplex=False)
+    proc = _mp.Process(target=_extract_in_child, args=(sender, args, char_budget, memory_mb), daemon=True)
+    proc.start()
+    sender.close()
+    try:
+        if not receiver.poll(timeout):
+            raise ExtractionError(f"Text extraction exceeded {timeout}s")
+        status, payload = receiver.recv()
+    except EOFError:
+        raise ExtractionError("Text extraction process died (likely over the memory limit)")
+    finally:
+        if proc.is_alive():
+            proc.kill()
+        proc.join()
+        receiver.close()
+    if status == "unsupported":
+        raise UnsupportedFormatError(payload)
+    if status != "ok":
+        raise ExtractionError(payload)
+    return payload
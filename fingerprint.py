@@ -0,0 +1,187 @@
+"""Resume fingerprints for dedup before text extraction and the LLM call.
+
+Three levels, cheapest first:
+
+* file_sha256: SHA-256 of the uploaded bytes (same file re-uploaded).
+* text_sha256: SHA-256 of the normalized extracted text (same resume in
+  another container, e.g. re-exported PDF).
+* MinHash over word shingles, bucketed with LSH, for lightly edited
+  resumes; candidates sharing a band are confirmed by estimated Jaccard.
+
+Text with fewer than MIN_TEXT_TOKENS tokens (scanned or image-only PDFs)
+gets no text hash or MinHash, since every such resume would look identical;
+those are deduplicated by file hash only.
+
+Fingerprints live in resume_fingerprints / resume_lsh_bands, next to the
+resumes row they point at.
+"""
+import re
+import zlib
+import hashlib
+from collections import namedtuple
+import numpy as np
+import psycopg2
+from psycopg2.extras import execute_values
+
+# MinHash / LSH parameters. 16 bands x 8 rows puts the LSH threshold near
+# Jaccard 0.7; candidates are then kept only at NEAR_DUP_THRESHOLD or above.
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+NEAR_DUP_THRESHOLD = 0.9
+# Below this many normalized tokens only the file hash is used
+MIN_TEXT_TOKENS = 20
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+# Fixed seed: signatures must stay comparable across processes and runs
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+Fingerprint = namedtuple("Fingerprint", ["file_sha256", "text_sha256", "signature"])
+
+# ------------------- Hashing -------------------
+def sha256_bytes(content):
+    return hashlib.sha256(content).hexdigest()
+
+def sha256_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def normalize_text(text):
+    """Lower-case alphanumeric tokens; whitespace, punctuation and layout
+    differences between extractions do not change the fingerprint."""
+    return " ".join(_TOKEN_RE.findall((text or "").lower()))
+
+def text_sha256(text):
+    return sha256_bytes(normalize_text(text).encode())
+
+def minhash_signature(text, shingle_size=SHINGLE_SIZE):
+    """(NUM_PERM,) uint32 MinHash signature of the word shingles of ``text``."""
+    tokens = normalize_text(text).split()
+    if len(tokens) < shingle_size:
+        shingles = {" ".join(tokens)}
+    else:
+        shingles = {" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # Universal hashing (a*x + b) mod p, one row per permutation
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=1).astype(np.uint32)
+
+def lsh_buckets(signature):
+    """(band, bucket) pairs; bucket is a signed 64-bit hash of the band's rows."""
+    signature = np.asarray(signature, dtype=np.uint32)
+    return [
+        (band, int.from_bytes(
+            hashlib.blake2b(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes(), digest_size=8).digest(),
+            "big", signed=True))
+        for band in range(LSH_BANDS)
+    ]
+
+def estimated_similarity(sig_a, sig_b):
+    return float(np.mean(np.asarray(sig_a) == np.asarray(sig_b)))
+
+def fingerprint_text(text, file_sha256=None):
+    """Fingerprint of an extracted resume; text_sha256 and signature are None
+    when the text is too short to tell resumes apart."""
+    if len(normalize_text(text).split()) < MIN_TEXT_TOKENS:
+        return Fingerprint(file_sha256, None, None)
+    return Fingerprint(file_sha256, text_sha256(text), minhash_signature(text))
+
+# ------------------- Storage -------------------
+def create_fingerprint_tables(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS resume_fingerprints (
+            resume_id INTEGER NOT NULL REFERENCES resumes (id) ON DELETE CASCADE,
+            file_sha256 TEXT,
+            text_sha256 TEXT,
+            signature BYTEA
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS resume_fingerprints_file_idx ON resume_fingerprints (file_sha256)")
+    cur.execute("CREATE INDEX IF NOT EXISTS resume_fingerprints_text_idx ON resume_fingerprints (text_sha256)")
+    cur.execute("CREATE INDEX IF NOT EXISTS resume_fingerprints_resume_idx ON resume_fingerprints (resume_id)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS resume_lsh_bands (
+            band SMALLINT NOT NULL,
+            bucket BIGINT NOT NULL,
+            resume_id INTEGER NOT NULL REFERENCES resumes (id) ON DELETE CASCADE
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS resume_lsh_bands_bucket_idx ON resume_lsh_bands (band, bucket)")
+    cur.execute("CREATE INDEX IF NOT EXISTS resume_lsh_bands_resume_idx ON resume_lsh_bands (resume_id)")
+    print("✓ Ensured resume fingerprint tables.")
+
+def store_fingerprints(cur, fingerprints):
+    """Record (resume_id, Fingerprint) pairs; the caller commits."""
+    fingerprints = [(resume_id, fp) for resume_id, fp in fingerprints if fp is not None]
+    if not fingerprints:
+        return
+    execute_values(cur, "INSERT INTO resume_fingerprints (resume_id, file_sha256, text_sha256, signature) VALUES %s", [
+        (resume_id, fp.file_sha256, fp.text_sha256,
+         None if fp.signature is None else psycopg2.Binary(np.asarray(fp.signature, dtype=np.uint32).tobytes()))
+        for resume_id, fp in fingerprints
+    ])
+    bands = [
+        (band, bucket, resume_id)
+        for resume_id, fp in fingerprints if fp.signature is not None
+        for band, bucket in lsh_buckets(fp.signature)
+    ]
+    if bands:
+        execute_values(cur, "INSERT INTO resume_lsh_bands (band, bucket, resume_id) VALUES %s", bands, page_size=1000)
+
+# ------------------- Lookups -------------------
+def find_known_files(cur, file_hashes):
+    """Subset of ``file_hashes`` already ingested."""
+    cur.execute("SELECT DISTINCT file_sha256 FROM resume_fingerprints WHERE file_sha256 = ANY(%s)",
+                (list(file_hashes),))
+    return {row[0] for row in cur.fetchall()}
+
+def find_exact_duplicate(cur, file_sha256=None, text_sha256=None):
+    """Id of a resume with the same file bytes or normalized text, or None."""
+    if file_sha256 is None and text_sha256 is None:
+        return None
+    cur.execute("""
+        SELECT resume_id FROM resume_fingerprints
+        WHERE file_sha256 = %s OR text_sha256 = %s
+        LIMIT 1
+    """, (file_sha256, text_sha256))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+def find_near_duplicate(cur, signature, threshold=NEAR_DUP_THRESHOLD):
+    """(resume_id, estimated Jaccard) of the closest LSH candidate at or above
+    ``threshold``, or None."""
+    buckets = lsh_buckets(signature)
+    cur.execute("""
+        SELECT DISTINCT f.resume_id, f.signature
+        FROM resume_lsh_bands b
+        JOIN resume_fingerprints f ON f.resume_id = b.resume_id
+        WHERE (b.band, b.bucket) IN (SELECT * FROM unnest(%s::smallint[], %s::bigint[]))
+          AND f.signature IS NOT NULL
+    """, ([band for band, _ in buckets], [bucket for _, bucket in buckets]))
+    best = None
+    for resume_id, stored in cur.fetchall():
+        similarity = estimated_similarity(signature, np.frombuffer(bytes(stored), dtype=np.uint32))
+        if similarity >= threshold and (best is None or similarity > best[1]):
+            best = (resume_id, similarity)
+    return best
+
+def find_duplicate(cur, fingerprint, threshold=NEAR_DUP_THRESHOLD):
+    """("duplicate" | "near_duplicate", resume_id) for an extracted resume, or None."""
+    resume_id = find_exact_duplicate(cur, fingerprint.file_sha256, fingerprint.text_sha256)
+    if resume_id is not None:
+        return "duplicate", resume_id
+    if fingerprint.signature is None:
+        return None
+    near = find_near_duplicate(cur, fingerprint.signature, threshold)
+    if near is not None:
+        return "near_duplicate", near[0]
+    return None
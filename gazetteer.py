@@ -0,0 +1,219 @@
+"""Indian location gazetteer shared by ingest, matching and the state backfill.
+
+State ids are the lower-case names that resumes.state_norm (LOWER(BTRIM(state)))
+holds, so every writer that stores ``state_name(state_id)`` and every reader
+that filters on state ids agree on the values.
+"""
+import re
+from functools import lru_cache
+
+# ------------------- States and union territories -------------------
+# Canonical id -> aliases (spelling variants, old names)
+STATES = {
+    "andhra pradesh": [],
+    "arunachal pradesh": [],
+    "assam": [],
+    "bihar": [],
+    "chhattisgarh": ["chattisgarh", "chhatisgarh"],
+    "goa": [],
+    "gujarat": ["gujrat"],
+    "haryana": [],
+    "himachal pradesh": [],
+    "jharkhand": [],
+    "karnataka": [],
+    "kerala": [],
+    "madhya pradesh": [],
+    "maharashtra": [],
+    "manipur": [],
+    "meghalaya": [],
+    "mizoram": [],
+    "nagaland": [],
+    "odisha": ["orissa"],
+    "punjab": [],
+    "rajasthan": [],
+    "sikkim": [],
+    "tamil nadu": ["tamilnadu"],
+    "telangana": ["telengana"],
+    "tripura": [],
+    "uttar pradesh": [],
+    "uttarakhand": ["uttaranchal"],
+    "west bengal": [],
+    "andaman and nicobar islands": ["andaman and nicobar", "andaman nicobar"],
+    "chandigarh": [],
+    "dadra and nagar haveli and daman and diu": ["dadra and nagar haveli", "daman and diu"],
+    "delhi": ["nct of delhi", "national capital territory of delhi", "delhi ncr", "ncr"],
+    "jammu and kashmir": ["jammu kashmir"],
+    "ladakh": [],
+    "lakshadweep": [],
+    "puducherry": ["pondicherry"],
+}
+
+# City -> state id. Aliases of a city are listed as their own entries.
+CITIES = {
+    # Maharashtra
+    "mumbai": "maharashtra", "bombay": "maharashtra", "navi mumbai": "maharashtra", "thane": "maharashtra",
+    "pune": "maharashtra", "poona": "maharashtra", "nagpur": "maharashtra", "nashik": "maharashtra",
+    "aurangabad": "maharashtra",
+    # Karnataka
+    "bangalore": "karnataka", "bengaluru": "karnataka", "mysore": "karnataka", "mysuru": "karnataka",
+    "mangalore": "karnataka", "mangaluru": "karnataka", "hubli": "karnataka",
+    # Telangana
+    "hyderabad": "telangana", "secunderabad": "telangana", "warangal": "telangana",
+    # Tamil Nadu
+    "chennai": "tamil nadu", "madras": "tamil nadu", "coimbatore": "tamil nadu", "madurai": "tamil nadu",
+    # Delhi
+    "new delhi": "delhi",
+    # Uttar Pradesh
+    "noida": "uttar pradesh", "greater noida": "uttar pradesh", "ghaziabad": "uttar pradesh",
+    "lucknow": "uttar pradesh", "kanpur": "uttar pradesh", "varanasi": "uttar pradesh",
+    # Haryana
+    "gurgaon": "haryana", "gurugram": "haryana", "faridabad": "haryana",
+    # West Bengal
+    "kolkata": "west bengal", "calcutta": "west bengal", "howrah": "west bengal",
+    # Gujarat
+    "ahmedabad": "gujarat", "surat": "gujarat", "vadodara": "gujarat", "baroda": "gujarat",
+    "gandhinagar": "gujarat", "rajkot": "gujarat",
+    # Rajasthan
+    "jaipur": "rajasthan", "udaipur": "rajasthan", "jodhpur": "rajasthan",
+    # Others
+    "patna": "bihar",
+    "bhopal": "madhya pradesh", "indore": "madhya pradesh",
+    "panaji": "goa", "margao": "goa",
+    "guwahati": "assam",
+    "mohali": "punjab", "amritsar": "punjab", "ludhiana": "punjab",
+    "ranchi": "jharkhand", "jamshedpur": "jharkhand",
+    "bhubaneswar": "odisha", "cuttack": "odisha",
+    "kochi": "kerala", "cochin": "kerala", "thiruvananthapuram": "kerala", "trivandrum": "kerala",
+    "kozhikode": "kerala",
+    "visakhapatnam": "andhra pradesh", "vizag": "andhra pradesh", "vijayawada": "andhra pradesh",
+    "dehradun": "uttarakhand",
+    "raipur": "chhattisgarh",
+    "shimla": "himachal pradesh",
+    "srinagar": "jammu and kashmir",
+}
+
+# Land borders; made symmetric in ADJACENCY below
+NEIGHBOR_STATES = {
+    "andhra pradesh": ["telangana", "karnataka", "tamil nadu", "odisha", "chhattisgarh"],
+    "arunachal pradesh": ["assam", "nagaland"],
+    "assam": ["arunachal pradesh", "nagaland", "manipur", "mizoram", "tripura", "meghalaya", "west bengal"],
+    "bihar": ["uttar pradesh", "jharkhand", "west bengal"],
+    "chhattisgarh": ["madhya pradesh", "maharashtra", "telangana", "odisha", "jharkhand", "uttar pradesh"],
+    "goa": ["maharashtra", "karnataka"],
+    "gujarat": ["rajasthan", "madhya pradesh", "maharashtra", "dadra and nagar haveli and daman and diu"],
+    "haryana": ["punjab", "himachal pradesh", "uttar pradesh", "rajasthan", "delhi", "chandigarh"],
+    "himachal pradesh": ["jammu and kashmir", "ladakh", "punjab", "uttarakhand"],
+    "jharkhand": ["uttar pradesh", "odisha", "west bengal"],
+    "karnataka": ["maharashtra", "telangana", "tamil nadu", "kerala"],
+    "kerala": ["tamil nadu", "puducherry"],
+    "madhya pradesh": ["rajasthan", "uttar pradesh", "maharashtra"],
+    "maharashtra": ["telangana", "dadra and nagar haveli and daman and diu"],
+    "manipur": ["nagaland", "mizoram"],
+    "mizoram": ["tripura"],
+    "punjab": ["jammu and kashmir", "rajasthan", "chandigarh"],
+    "rajasthan": ["uttar pradesh"],
+    "sikkim": ["west bengal"],
+    "tamil nadu": ["puducherry"],
+    "uttar pradesh": ["uttarakhand", "delhi"],
+    "west bengal": ["odisha"],
+    "jammu and kashmir": ["ladakh"],
+}
+
+def _symmetric(edges):
+    adjacency = {state: set() for state in STATES}
+    for state, neighbors in edges.items():
+        for neighbor in neighbors:
+            adjacency[state].add(neighbor)
+            adjacency[neighbor].add(state)
+    return {state: frozenset(neighbors) for state, neighbors in adjacency.items()}
+
+ADJACENCY = _symmetric(NEIGHBOR_STATES)
+
+# ------------------- Compiled matcher -------------------
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Match kinds; a city hit beats a state hit anywhere in the string
+CITY, STATE = 0, 1
+
+def _tokens(text):
+    return _TOKEN_RE.findall(text.lower())
+
+class Gazetteer:
+    """Word-level trie over every state, city and alias.
+
+    Matching walks the trie from each token and keeps the longest hit, so
+    "new delhi" wins over "delhi" and matches respect word boundaries.
+    """
+
+    def __init__(self, states=STATES, cities=CITIES):
+        self.trie = {}
+        for state, aliases in states.items():
+            for name in [state, *aliases]:
+                self._add(name, (STATE, state))
+        for city, state in cities.items():
+            self._add(city, (CITY, state))
+
+    def _add(self, name, value):
+        node = self.trie
+        for token in _tokens(name):
+            node = node.setdefault(token, {})
+        # Keep the city reading when a name is both (e.g. "goa" the state)
+        if node.get(None, (STATE,))[0] >= value[0]:
+            node[None] = value
+
+    def find(self, text):
+        """(kind, state_id, token_position) for each longest match in ``text``."""
+        tokens = _tokens(text)
+        trie = self.trie
+        hits = []
+        i, n = 0, len(tokens)
+        while i < n:
+            node = trie.get(tokens[i])
+            if node is None:
+                i += 1
+                continue
+            match, end = node.get(None), i + 1
+            for j in range(i + 1, n):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                if None in node:
+                    match, end = node[None], j + 1
+            if match is None:
+                i += 1
+                continue
+            hits.append((match[0], match[1], i))
+            i = end
+        return hits
+
+    def resolve(self, text):
+        hits = self.find(text)
+        if not hits:
+            return None
+        return min(hits, key=lambda hit: (hit[0], hit[2]))[1]
+
+_gazetteer = Gazetteer()
+
+# ------------------- Lookups -------------------
+@lru_cache(maxsize=65536)
+def resolve_state(location):
+    """State id for a free-text location ("Andheri, Mumbai" -> "maharashtra"), or None."""
+    if not location:
+        return None
+    return _gazetteer.resolve(location)
+
+def canonical_state(name):
+    """State id for a state name or alias; unknown names are lower-cased and trimmed."""
+    if not name:
+        return None
+    return resolve_state(name) or name.strip().lower()
+
+def state_name(state_id):
+    """Display form stored in resumes.state; lower-cases back to ``state_id``."""
+    return state_id.title() if state_id else state_id
+
+def neighbor_states(state_id):
+    return ADJACENCY.get(state_id, frozenset())
+
+def allowed_states(state_id):
+    """``state_id`` followed by its neighbors, for the state_norm = ANY(...) filter."""
+    return [state_id] + sorted(neighbor_states(state_id))
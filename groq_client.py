@@ -0,0 +1,144 @@
+import os
+import time
+import random
+import asyncio
+import threading
+import httpx
+
+GROQ_BASE_URL = os.environ.get("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "")
+
+# --- Rate limits (match the Groq account tier) ---
+REQUESTS_PER_MINUTE = int(os.environ.get("GROQ_REQUESTS_PER_MINUTE", 30))
+TOKENS_PER_MINUTE = int(os.environ.get("GROQ_TOKENS_PER_MINUTE", 30000))
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5      # seconds
+BACKOFF_MAX = 30.0
+REQUEST_TIMEOUT = 60.0
+MAX_CONNECTIONS = 20
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class GroqAPIError(Exception):
+    def __init__(self, status_code, text):
+        super().__init__(f"GROQ API error {status_code}: {text}")
+        self.status_code = status_code
+        self.text = text
+
+class TokenBucket:
+    """Refills ``rate_per_minute`` units per minute up to a burst of one minute.
+
+    Shared by every event loop in the process, so waits are computed under a
+    thread lock and slept with asyncio.sleep.
+    """
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.tokens = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, amount):
+        # Large requests may exceed the burst; let them through once the bucket is full
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self, amount=1):
+        wait = self._reserve(amount)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+def estimate_tokens(payload):
+    # ~4 characters per token plus the completion budget
+    chars = sum(len(m.get("content", "")) for m in payload.get("messages", []))
+    return chars // 4 + payload.get("max_tokens", 1024)
+
+_request_bucket = TokenBucket(REQUESTS_PER_MINUTE)
+_token_bucket = TokenBucket(TOKENS_PER_MINUTE)
+
+def _backoff_delay(attempt, retry_after=None):
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    # Full jitter exponential backoff
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+class AsyncGroqClient:
+    """Keep-alive HTTP client for the Groq chat completions API."""
+
+    def __init__(self, base_url=GROQ_BASE_URL, api_key=GROQ_API_KEY,
+                 request_bucket=_request_bucket, token_bucket=_token_bucket):
+        self.request_bucket = request_bucket
+        self.token_bucket = token_bucket
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+            timeout=REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+        )
+
+    async def chat_completion(self, payload):
+        """POST /chat/completions with rate limiting and retries; returns the
+        message content string."""
+        for attempt in range(MAX_RETRIES + 1):
+            await self.request_bucket.acquire(1)
+            await self.token_bucket.acquire(estimate_tokens(payload))
+            try:
+                response = await self._client.post("/chat/completions", json=payload)
+            except httpx.TransportError:
+                if attempt == MAX_RETRIES:
+                    raise
+                await asyncio.sleep(_backoff_delay(attempt))
+                continue
+
+            if response.status_code == 200:
+                return response.json()["choices"][0]["message"]["content"]
+            if response.status_code not in RETRYABLE_STATUS or attempt == MAX_RETRIES:
+                raise GroqAPIError(response.status_code, response.text)
+            await asyncio.sleep(_backoff_delay(attempt, response.headers.get("retry-after")))
+
+    async def aclose(self):
+        await self._client.aclose()
+
+# httpx.AsyncClient is bound to the loop it was first used on, so keep one per loop
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_async_client():
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        client = _clients.get(loop)
+        if client is None:
+            client = _clients[loop] = AsyncGroqClient()
+    return client
+
+async def chat_completion(payload):
+    return await get_async_client().chat_completion(payload)
+
+# ------------------- Sync wrapper -------------------
+_sync_loop = None
+_sync_loop_lock = threading.Lock()
+
+def _get_sync_loop():
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="groq-client", daemon=True).start()
+    return _sync_loop
+
+def run_sync(coro):
+    """Run a coroutine on the shared background loop from sync code (any thread)."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_sync_loop()).result()
+
+def chat_completion_sync(payload):
+    return run_sync(chat_completion(payload))
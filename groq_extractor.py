@@ -1,147 +1,127 @@
-import requests
 import json
 import re
-import time
-
-#GROQ_API_KEY = ""  # Leave blank or load from environment variable
+from groq_client import chat_completion, run_sync
+from llm_cache import cached_llm_call, cached_llm_call_async
 
 GROQ_MODEL = "llama3-8b-8192"
-# ------------------- Resume Extraction -------------------
-def extract_structured_info_groq(resume_text):
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    system_prompt = {
-        "role": "system",
-        "content": (
-            "You're an AI that extracts structured info from resumes. "
-            "Return ONLY a valid JSON object with the following fields:\n"
-            "- name (string)\n"
-            "- location (string)\n"
-            "- current_job_title (string)\n"
-            "- preferred_job_title (string)\n"
-            "- skills (array of strings)\n"
-            "- experience (array of objects with company, title, duration, description)\n"
-            "- education (array of objects with institution, degree, field, year)\n\n"
-            "Example:\n"
-            "{\n"
-            "  \"name\": \"John Doe\",\n"
-            "  \"location\": \"New York, USA\",\n"
-            "  \"current_job_title\": \"Software Engineer\",\n"
-            "  \"preferred_job_title\": \"Senior ML Engineer\",\n"
-            "  \"skills\": [\"Python\", \"Machine Learning\", \"TensorFlow\"],\n"
-            "  \"experience\": [\n"
-            "    {\n"
-            "      \"company\": \"Tech Corp\",\n"
-            "      \"title\": \"Software Engineer\",\n"
-            "      \"duration\": \"2020-2023\",\n"
-            "      \"description\": \"Developed ML models and APIs\"\n"
-            "    }\n"
-            "  ],\n"
-            "  \"education\": [\n"
-            "    {\n"
-            "      \"institution\": \"University of Technology\",\n"
-            "      \"degree\": \"Bachelor's\",\n"
-            "      \"field\": \"Computer Science\",\n"
-            "      \"year\": \"2020\"\n"
-            "    }\n"
-            "  ]\n"
-            "}"
-        )
-    }
-
-    user_prompt = {"role": "user", "content": resume_text[:4000]}
-
-    payload = {
+MAX_INPUT_CHARS = 4000
+
+# Bump when a prompt changes so cached extractions are not reused
+RESUME_PROMPT_VERSION = "resume-v1"
+JD_PROMPT_VERSION = "jd-v1"
+YEARS_PROMPT_VERSION = "years-v1"
+
+RESUME_SYSTEM_PROMPT = {
+    "role": "system",
+    "content": (
+        "You're an AI that extracts structured info from resumes. "
+        "Return ONLY a valid JSON object with the following fields:\n"
+        "- name (string)\n"
+        "- location (string)\n"
+        "- current_job_title (string)\n"
+        "- preferred_job_title (string)\n"
+        "- skills (array of strings)\n"
+        "- experience (array of objects with company, title, duration, description)\n"
+        "- education (array of objects with institution, degree, field, year)\n\n"
+        "Example:\n"
+        "{\n"
+        "  \"name\": \"John Doe\",\n"
+        "  \"location\": \"New York, USA\",\n"
+        "  \"current_job_title\": \"Software Engineer\",\n"
+        "  \"preferred_job_title\": \"Senior ML Engineer\",\n"
+        "  \"skills\": [\"Python\", \"Machine Learning\", \"TensorFlow\"],\n"
+        "  \"experience\": [\n"
+        "    {\n"
+        "      \"company\": \"Tech Corp\",\n"
+        "      \"title\": \"Software Engineer\",\n"
+        "      \"duration\": \"2020-2023\",\n"
+        "      \"description\": \"Developed ML models and APIs\"\n"
+        "    }\n"
+        "  ],\n"
+        "  \"education\": [\n"
+        "    {\n"
+        "      \"institution\": \"University of Technology\",\n"
+        "      \"degree\": \"Bachelor's\",\n"
+        "      \"field\": \"Computer Science\",\n"
+        "      \"year\": \"2020\"\n"
+        "    }\n"
+        "  ]\n"
+        "}"
+    )
+}
+
+JD_SYSTEM_PROMPT = {
+    "role": "system",
+    "content": (
+        "You're an AI that extracts structured info from job descriptions. "
+        "Return ONLY a valid JSON object with the following fields:\n"
+        "- job_title (string)\n"
+        "- required_skills (array of strings)\n"
+        "- required_experience (string)\n"
+        "- required_education (string)\n"
+        "- location (string)\n\n"
+        "Example:\n"
+        "{\n"
+        "  \"job_title\": \"Data Scientist\",\n"
+        "  \"required_skills\": [\"Python\", \"SQL\", \"Machine Learning\"],\n"
+        "  \"required_experience\": \"3+ years in data science or analytics\",\n"
+        "  \"required_education\": \"Bachelor's or higher in Computer Science or related field\",\n"
+        "  \"location\": \"Delhi, India\"\n"
+        "}"
+    )
+}
+
+def _payload(messages):
+    return {
         "model": GROQ_MODEL,
-        "messages": [system_prompt, user_prompt],
+        "messages": messages,
         "temperature": 0.2
     }
 
-    response = requests.post(url, headers=headers, json=payload)
-    time.sleep(2)
-
-    if response.status_code != 200:
-        raise Exception(f"GROQ API error {response.status_code}: {response.text}")
-
-    data = response.json()
-    content = data["choices"][0]["message"]["content"]
-
+def _parse_json_block(content, source):
     json_text = re.search(r"\{.*\}", content, re.DOTALL)
     if not json_text:
         raise Exception(f"Could not extract JSON block from: {content}")
-    
+
     try:
         return json.loads(json_text.group())
     except json.JSONDecodeError:
-        raise Exception("Failed to parse extracted JSON from resume.")
-
-# ------------------- Job Description Extraction -------------------
-def extract_structured_info_groq_jd(jd_text):
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
+        raise Exception(f"Failed to parse extracted JSON from {source}.")
 
-    system_prompt = {
-        "role": "system",
-        "content": (
-            "You're an AI that extracts structured info from job descriptions. "
-            "Return ONLY a valid JSON object with the following fields:\n"
-            "- job_title (string)\n"
-            "- required_skills (array of strings)\n"
-            "- required_experience (string)\n"
-            "- required_education (string)\n"
-            "- location (string)\n\n"
-            "Example:\n"
-            "{\n"
-            "  \"job_title\": \"Data Scientist\",\n"
-            "  \"required_skills\": [\"Python\", \"SQL\", \"Machine Learning\"],\n"
-            "  \"required_experience\": \"3+ years in data science or analytics\",\n"
-            "  \"required_education\": \"Bachelor's or higher in Computer Science or related field\",\n"
-            "  \"location\": \"Delhi, India\"\n"
-            "}"
-        )
-    }
-
-    user_prompt = {"role": "user", "content": jd_text[:4000]}
-
-    payload = {
-        "model": GROQ_MODEL,
-        "messages": [system_prompt, user_prompt],
-        "temperature": 0.2
-    }
+# ------------------- Resume Extraction -------------------
+async def _request_structured_info(resume_text):
+    user_prompt = {"role": "user", "content": resume_text}
+    content = await chat_completion(_payload([RESUME_SYSTEM_PROMPT, user_prompt]))
+    return _parse_json_block(content, "resume")
 
-    response = requests.post(url, headers=headers, json=payload)
-    time.sleep(1)
+async def extract_structured_info_groq_async(resume_text):
+    text = resume_text[:MAX_INPUT_CHARS]
+    return await cached_llm_call_async(GROQ_MODEL, RESUME_PROMPT_VERSION, text,
+                                       lambda: _request_structured_info(text))
 
-    if response.status_code != 200:
-        raise Exception(f"GROQ API error {response.status_code}: {response.text}")
+def extract_structured_info_groq(resume_text):
+    text = resume_text[:MAX_INPUT_CHARS]
+    return cached_llm_call(GROQ_MODEL, RESUME_PROMPT_VERSION, text,
+                           lambda: run_sync(_request_structured_info(text)))
 
-    data = response.json()
-    content = data["choices"][0]["message"]["content"]
+# ------------------- Job Description Extraction -------------------
+async def _request_structured_info_jd(jd_text):
+    user_prompt = {"role": "user", "content": jd_text}
+    content = await chat_completion(_payload([JD_SYSTEM_PROMPT, user_prompt]))
+    return _parse_json_block(content, "job description")
 
-    json_text = re.search(r"\{.*\}", content, re.DOTALL)
-    if not json_text:
-        raise Exception(f"Could not extract JSON block from: {content}")
+async def extract_structured_info_groq_jd_async(jd_text):
+    text = jd_text[:MAX_INPUT_CHARS]
+    return await cached_llm_call_async(GROQ_MODEL, JD_PROMPT_VERSION, text,
+                                       lambda: _request_structured_info_jd(text))
 
-    try:
-        return json.loads(json_text.group())
-    except json.JSONDecodeError:
-        raise Exception("Failed to parse extracted JSON from job description.")
+def extract_structured_info_groq_jd(jd_text):
+    text = jd_text[:MAX_INPUT_CHARS]
+    return cached_llm_call(GROQ_MODEL, JD_PROMPT_VERSION, text,
+                           lambda: run_sync(_request_structured_info_jd(text)))
 
 # ------------------- Relevant Years of Experience -------------------
-def extract_relevant_years_experience_groq(job_title, experience_text):
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
+async def _request_relevant_years_experience(job_title, experience_text):
     prompt = f"""
 You are an expert resume analyzer.
 
@@ -157,18 +137,18 @@ Experience Section:
 Return ONLY a float value. Example: 3.5
 """
 
-    payload = {
-        "model": GROQ_MODEL,
-        "messages": [{"role": "user", "content": prompt}],
-        "temperature": 0.2
-    }
-
-    response = requests.post(url, headers=headers, json=payload)
-    if response.status_code != 200:
-        raise Exception(f"GROQ API error {response.status_code}: {response.text}")
-
-    content = response.json()["choices"][0]["message"]["content"]
+    content = await chat_completion(_payload([{"role": "user", "content": prompt}]))
     try:
         return float(content.strip())
-    except:
+    except ValueError:
         return 0.0
+
+async def extract_relevant_years_experience_groq_async(job_title, experience_text):
+    text = f"{job_title}\n{experience_text}"
+    return await cached_llm_call_async(GROQ_MODEL, YEARS_PROMPT_VERSION, text,
+                                       lambda: _request_relevant_years_experience(job_title, experience_text))
+
+def extract_relevant_years_experience_groq(job_title, experience_text):
+    text = f"{job_title}\n{experience_text}"
+    return cached_llm_call(GROQ_MODEL, YEARS_PROMPT_VERSION, text,
+                           lambda: run_sync(_request_relevant_years_experience(job_title, experience_text)))
@@ -0,0 +1,246 @@
+"""Background ingestion queue for bulk resume uploads.
+
+/upload_resume/batch spools the uploaded files under SPOOL_DIR and records
+one row per file in a SQLite job table; a pool of worker threads claims
+queued files, runs resume_parser.ingest_resume_file on them and stores the
+outcome, which /jobs/{id} reports. Because the queue is on disk, uvicorn
+workers can share it and files left "processing" by a crashed worker are
+re-queued once their lease expires. A file gets at most MAX_ATTEMPTS tries,
+whether they ended in an error or an expired lease; errors that would
+repeat (unsupported format, extraction limits) are not retried. A spooled
+file is deleted once its row reaches a terminal status.
+"""
+import os
+import time
+import uuid
+import shutil
+import sqlite3
+import threading
+from llm_cache import CACHE_DIR
+
+JOBS_DB_PATH = os.path.join(CACHE_DIR, "ingest_jobs.sqlite3")
+SPOOL_DIR = os.path.join(CACHE_DIR, "uploads")
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "2"))
+MAX_ATTEMPTS = 3
+LEASE_SECONDS = 15 * 60     # "processing" rows older than this are re-queued
+POLL_INTERVAL = 2.0         # idle workers re-check the queue this often
+
+TERMINAL_STATUSES = ("ok", "skipped", "duplicate", "near_duplicate", "error")
+
+def _remove_spooled(path):
+    try:
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))  # only succeeds once the job's last file is gone
+    except OSError:
+        pass
+
+class JobQueue:
+    """Jobs and their files in SQLite (WAL, one connection per thread)."""
+
+    def __init__(self, path=JOBS_DB_PATH, spool_dir=SPOOL_DIR):
+        self.path = path
+        self.spool_dir = spool_dir
+        self._local = threading.local()
+        self.wakeup = threading.Event()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        os.makedirs(spool_dir, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    created REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_files (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL REFERENCES jobs (id),
+                    filename TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    updated REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS job_files_status_idx ON job_files (status, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS job_files_job_idx ON job_files (job_id)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def create_job(self, files):
+        """Spool ``(filename, file_obj)`` pairs to disk and queue them.
+        Files are streamed, never held in memory whole. Returns the job id."""
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.spool_dir, job_id)
+        os.makedirs(job_dir)
+        spooled = []
+        for i, (filename, file_obj) in enumerate(files):
+            # Keep the extension: extract_text dispatches on it
+            path = os.path.join(job_dir, f"{i:05d}{os.path.splitext(filename)[1].lower()}")
+            with open(path, "wb") as out:
+                shutil.copyfileobj(file_obj, out, 1 << 20)
+            spooled.append((job_id, filename, path))
+
+        now = time.time()
+        conn = self._transaction()
+        try:
+            conn.execute("INSERT INTO jobs (id, created) VALUES (?, ?)", (job_id, now))
+            conn.executemany(
+                "INSERT INTO job_files (job_id, filename, path, updated) VALUES (?, ?, ?, ?)",
+                [(*row, now) for row in spooled],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+        self.wakeup.set()
+        return job_id
+
+    def claim(self):
+        """Mark the oldest queued file (or an expired lease) as processing and
+        return ``(file_id, filename, path)``, or None when the queue is empty.
+        Expired leases that used their last attempt are failed instead, so a
+        file that crashes or hangs its worker is not retried forever."""
+        now = time.time()
+        conn = self._transaction()
+        try:
+            expired = conn.execute("""
+                UPDATE job_files SET status = 'error', error = 'Worker lease expired on the last attempt', updated = ?
+                WHERE status = 'processing' AND updated < ? AND attempts >= ?
+                RETURNING path
+            """, (now, now - LEASE_SECONDS, MAX_ATTEMPTS)).fetchall()
+            row = conn.execute("""
+                SELECT id, filename, path FROM job_files
+                WHERE status = 'queued' OR (status = 'processing' AND updated < ?)
+                ORDER BY id LIMIT 1
+            """, (now - LEASE_SECONDS,)).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE job_files SET status = 'processing', attempts = attempts + 1, updated = ? WHERE id = ?",
+                    (now, row[0]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        for (path,) in expired:
+            _remove_spooled(path)
+        return row
+
+    def finish(self, file_id, status, error=None):
+        self._conn().execute(
+            "UPDATE job_files SET status = ?, error = ?, updated = ? WHERE id = ?",
+            (status, error, time.time(), file_id),
+        )
+
+    def fail(self, file_id, error, retry=True):
+        """Re-queue a failed file, or give up after MAX_ATTEMPTS or when
+        ``retry`` is False; a file given up on is removed from the spool."""
+        row = self._conn().execute("""
+            UPDATE job_files
+            SET status = CASE WHEN attempts >= ? THEN 'error' ELSE 'queued' END, error = ?, updated = ?
+            WHERE id = ?
+            RETURNING status, path
+        """, (MAX_ATTEMPTS if retry else 0, error, time.time(), file_id)).fetchone()
+        if row is not None and row[0] == "error":
+            _remove_spooled(row[1])
+
+    def job_status(self, job_id):
+        conn = self._conn()
+        job = conn.execute("SELECT created FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        files = [
+            {"filename": filename, "status": status, "attempts": attempts, "error": error}
+            for filename, status, attempts, error in conn.execute(
+                "SELECT filename, status, attempts, error FROM job_files WHERE job_id = ? ORDER BY id", (job_id,)
+            )
+        ]
+        counts = {}
+        for f in files:
+            counts[f["status"]] = counts.get(f["status"], 0) + 1
+        done = sum(counts.get(status, 0) for status in TERMINAL_STATUSES)
+        return {
+            "job_id": job_id,
+            "created": job[0],
+            "total": len(files),
+            "done": done,
+            "finished": done == len(files),
+            "counts": counts,
+            "files": files,
+        }
+
+# ------------------- Workers -------------------
+class IngestWorkers:
+    """Threads that drain the queue with resume_parser.ingest_resume_file."""
+
+    def __init__(self, queue, num_workers=INGEST_WORKERS):
+        self.queue = queue
+        self.num_workers = num_workers
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._run, name=f"ingest-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"Started {self.num_workers} ingest workers.")
+
+    def stop(self, timeout=30):
+        self._stop.set()
+        self.queue.wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        # Imported here so the queue itself stays free of the model/LLM stack
+        from resume_parser import ingest_resume_file
+        from extract_text import ExtractionError, UnsupportedFormatError
+
+        # Deterministic failures: another attempt would fail the same way
+        permanent_errors = (UnsupportedFormatError, ExtractionError)
+
+        while not self._stop.is_set():
+            claimed = self.queue.claim()
+            if claimed is None:
+                self.queue.wakeup.wait(POLL_INTERVAL)
+                self.queue.wakeup.clear()
+                continue
+
+            file_id, filename, path = claimed
+            try:
+                status = ingest_resume_file(path)
+            except Exception as e:
+                print(f" Error ingesting {filename}: {e}")
+                self.queue.fail(file_id, str(e), retry=not isinstance(e, permanent_errors))
+                continue
+            print(f" Ingested {filename}: {status}")
+            self.queue.finish(file_id, status)
+            _remove_spooled(path)
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue()
+    return _job_queue
@@ -0,0 +1,90 @@
+import os
+import threading
+import hashlib
+import numpy as np
+from llm_cache import CACHE_DIR, SQLiteCache, LRUCache
+from groq_extractor import GROQ_MODEL, JD_PROMPT_VERSION, MAX_INPUT_CHARS
+from embedding_service import MODEL_NAME
+
+JD_CACHE_SIZE = 1024
+JD_CACHE_DISK = os.environ.get("JD_CACHE_DISK", "1") == "1"
+JD_CACHE_PATH = os.path.join(CACHE_DIR, "jd_cache.sqlite3")
+JD_CACHE_TTL = 7 * 24 * 3600
+
+def normalize_jd_text(jd_text):
+    # Whitespace-only edits (re-pasting, trailing newlines) map to the same entry
+    return " ".join(jd_text[:MAX_INPUT_CHARS].split())
+
+def jd_key(jd_text):
+    payload = "\0".join([GROQ_MODEL, JD_PROMPT_VERSION, MODEL_NAME, normalize_jd_text(jd_text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class JDCache:
+    """Structured JD + section embeddings, keyed by normalized JD text.
+
+    Memory tier first, then an optional SQLite tier shared by every worker.
+    """
+
+    def __init__(self, maxsize=JD_CACHE_SIZE, disk_path=JD_CACHE_PATH if JD_CACHE_DISK else None):
+        self.memory = LRUCache(maxsize)
+        self.disk = SQLiteCache(disk_path, ttl=JD_CACHE_TTL) if disk_path else None
+        self.disk_hits = 0
+
+    def get(self, jd_text):
+        key = jd_key(jd_text)
+        entry = self.memory.get(key)
+        if entry is not None or self.disk is None:
+            return entry
+        return self._from_disk(key, self.disk.get(key))
+
+    async def get_async(self, jd_text):
+        """get for the event loop: the memory tier inline, the disk tier in a thread."""
+        key = jd_key(jd_text)
+        entry = self.memory.get(key)
+        if entry is not None or self.disk is None:
+            return entry
+        return self._from_disk(key, await self.disk.get_async(key))
+
+    def _from_disk(self, key, stored):
+        if stored is None:
+            return None
+        entry = (
+            {section: np.asarray(vec, dtype=np.float32) for section, vec in stored["embeddings"].items()},
+            stored["structured"],
+        )
+        self.disk_hits += 1
+        self.memory.set(key, entry)
+        return entry
+
+    def set(self, jd_text, embeddings, jd_structured):
+        key = jd_key(jd_text)
+        self.memory.set(key, (embeddings, jd_structured))
+        if self.disk is not None:
+            self.disk.set(key, self._to_disk(embeddings, jd_structured))
+
+    async def set_async(self, jd_text, embeddings, jd_structured):
+        key = jd_key(jd_text)
+        self.memory.set(key, (embeddings, jd_structured))
+        if self.disk is not None:
+            await self.disk.set_async(key, self._to_disk(embeddings, jd_structured))
+
+    @staticmethod
+    def _to_disk(embeddings, jd_structured):
+        return {
+            "embeddings": {section: np.asarray(vec).tolist() for section, vec in embeddings.items()},
+            "structured": jd_structured,
+        }
+
+    def stats(self):
+        return {**self.memory.stats(), "disk_enabled": self.disk is not None, "disk_hits": self.disk_hits}
+
+_jd_cache = None
+_jd_cache_lock = threading.Lock()
+
+def get_jd_cache():
+    global _jd_cache
+    if _jd_cache is None:
+        with _jd_cache_lock:
+            if _jd_cache is None:
+                _jd_cache = JDCache()
+    return _jd_cache
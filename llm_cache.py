@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Anchored to this file, not the working directory: api.py chdirs to its own
+# directory, and the scripts that bump the corpus generation must share it
+CACHE_DIR = os.environ.get("RESUME_MATCHER_CACHE_DIR",
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+LLM_CACHE_PATH = os.path.join(CACHE_DIR, "llm_cache.sqlite3")
+LLM_CACHE_TTL = 30 * 24 * 3600     # seconds
+LLM_CACHE_MAX_ENTRIES = 100_000
+EVICTION_CHECK_EVERY = 100          # writes between size checks
+
+def make_key(*parts):
+    """Content-addressed key: sha256 over the given parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class SQLiteCache:
+    """Persistent JSON key/value cache with a TTL and LRU size bound.
+
+    Safe to share between threads (one SQLite connection per thread) and
+    between processes (WAL mode).
+    """
+
+    def __init__(self, path, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_idx ON entries (accessed)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        with self._conn() as conn:
+            row = conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def set(self, key, value):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+        self._writes += 1
+        if self._writes % EVICTION_CHECK_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        with self._conn() as conn:
+            if self.ttl is not None:
+                conn.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,))
+            (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            overflow = count - self.max_entries
+            if overflow > 0:
+                conn.execute("""
+                    DELETE FROM entries WHERE key IN (
+                        SELECT key FROM entries ORDER BY accessed LIMIT ?
+                    )
+                """, (overflow,))
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM entries")
+
+    # SQLite calls block (a get also writes ``accessed`` and can wait for the
+    # write lock), so async callers run them in the default thread pool
+    async def get_async(self, key):
+        return await asyncio.to_thread(self.get, key)
+
+    async def set_async(self, key, value):
+        await asyncio.to_thread(self.set, key, value)
+
+class LRUCache:
+    """Thread-safe in-process LRU with hit/miss counters."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    global _llm_cache
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = SQLiteCache(LLM_CACHE_PATH)
+    return _llm_cache
+
+def cached_llm_call(model, prompt_version, text, compute):
+    """Return the cached result for (model, prompt_version, text) or compute
+    and store it. ``text`` must be exactly what is sent to the model (i.e.
+    already truncated)."""
+    if os.environ.get("LLM_CACHE_DISABLED") == "1":
+        return compute()
+    cache = get_llm_cache()
+    key = make_key(model, prompt_version, text)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+    result = compute()
+    cache.set(key, result)
+    return result
+
+async def cached_llm_call_async(model, prompt_version, text, compute):
+    """Async variant of cached_llm_call; ``compute`` returns an awaitable."""
+    if os.environ.get("LLM_CACHE_DISABLED") == "1":
+        return await compute()
+    cache = get_llm_cache()
+    key = make_key(model, prompt_version, text)
+    hit = await cache.get_async(key)
+    if hit is not None:
+        return hit
+    result = await compute()
+    await cache.set_async(key, result)
+    return result
@@ -1,77 +1,85 @@
-import psycopg2
+import asyncio
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-from groq_extractor import extract_structured_info_groq_jd
-import ast
+import embedding_service
+from groq_extractor import extract_structured_info_groq_jd, extract_structured_info_groq_jd_async
+from db import db_connection, get_async_pool, parse_vector_text, ann_search_settings, apply_ann_settings, \
+    apply_ann_settings_async, POOL_MAX_CONN, ASYNC_POOL_MAX_CONN
+from scoring import SECTION_WEIGHTS, SECTIONS, EMBEDDING_DIM, l2_normalize, score_candidates, jd_matrix, \
+    composite_vector
+from groq_client import run_sync
+from jd_cache import get_jd_cache
+from result_cache import get_result_cache, result_key, get_corpus_generation
+from gazetteer import resolve_state, allowed_states
 import re
 
-# --- Database config ---
-DB_CONFIG = {
-    "dbname": "dbresume",
-    "user": "postgres",
-    "password": "1234",
-    "host": "localhost",
-    "port": 5432
-}
+# Rows pulled by the ANN stage and re-ranked with the weighted section score
+CANDIDATE_POOL = 2000
+# HNSW returns at most ef_search rows per scan; 1000 is pgvector's maximum
+MAX_EF_SEARCH = 1000
+DEFAULT_EF_SEARCH = MAX_EF_SEARCH
+# ivfflat.probes accepts 1..32768
+MAX_PROBES = 32768
+DEFAULT_PROBES = None
+# "auto" counts the rows in the allowed states and picks an exact scan for
+# small sets, otherwise an iterative index scan with an exact fallback if it
+# comes back short. See db.ann_search_settings for the other modes.
+DEFAULT_SEARCH_MODE = "auto"
+EXACT_SCAN_MAX_ROWS = 20_000
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# "multi" runs one ANN list per section below and fuses them with weighted
+# reciprocal-rank fusion; "composite" runs one ANN list on the stored
+# weighted composite vector; "halfvec" / "binary" do the same over the
+# quantized composite indexes (db.create_quantized_indexes), and the float32
+# re-rank restores precision; "title" is the job-title-only ANN stage.
+RETRIEVAL_MODES = ("multi", "composite", "halfvec", "binary", "title")
+DEFAULT_RETRIEVAL = "multi"
+RETRIEVAL_SECTIONS = ["job_titles", "skills", "experience"]
+RETRIEVAL_PER_SECTION = 1000
+RRF_K = 60
 
-SECTION_WEIGHTS = {
-    "skills": 0.25,
-    "experience": 0.25,
-    "education": 0.15,
-    "job_titles": 0.35
-}
+# Batch matching fetches candidates for at most BATCH_JD_CHUNK JDs of a state
+# group at a time (a chunk holds up to BATCH_JD_CHUNK * CANDIDATE_POOL rows),
+# and runs at most half a pool's worth of chunks concurrently so the rest of
+# the API keeps getting connections
+BATCH_JD_CHUNK = 8
+BATCH_DB_CONCURRENCY = max(1, POOL_MAX_CONN // 2)
+BATCH_DB_CONCURRENCY_ASYNC = max(1, ASYNC_POOL_MAX_CONN // 2)
 
-# --- City to State mapping ---
-CITY_TO_STATE = {
-    "mumbai": "maharashtra",
-    "pune": "maharashtra",
-    "nagpur": "maharashtra",
-    "bangalore": "karnataka",
-    "bengaluru": "karnataka",
-    "hyderabad": "telangana",
-    "chennai": "tamil nadu",
-    "delhi": "delhi",
-    "noida": "uttar pradesh",
-    "gurgaon": "haryana",
-    "kolkata": "west bengal",
-    "ahmedabad": "gujarat",
-    "jaipur": "rajasthan"
-}
-
-# --- Neighbor states dictionary ---
-NEIGHBOR_STATES = {
-    'maharashtra': ['gujarat', 'madhya pradesh', 'chhattisgarh', 'telangana', 'karnataka', 'goa'],
-    'karnataka': ['maharashtra', 'andhra pradesh', 'telangana', 'tamil nadu', 'kerala', 'goa'],
-    'telangana': ['maharashtra', 'chhattisgarh', 'andhra pradesh', 'karnataka'],
-    'tamil nadu': ['kerala', 'karnataka', 'andhra pradesh'],
-    'delhi': ['haryana', 'uttar pradesh'],
-    'uttar pradesh': ['uttarakhand', 'delhi', 'haryana', 'rajasthan', 'madhya pradesh', 'bihar'],
-    'haryana': ['punjab', 'delhi', 'uttar pradesh', 'rajasthan', 'himachal pradesh'],
-    'west bengal': ['bihar', 'jharkhand', 'odisha', 'assam', 'sikkim'],
-    'gujarat': ['maharashtra', 'madhya pradesh', 'rajasthan'],
-    'rajasthan': ['gujarat', 'madhya pradesh', 'uttar pradesh', 'haryana', 'punjab']
-}
+# Stored section vectors are L2-normalized (db.embed_resumes, migrate_embeddings.py),
+# so re-ranking can skip re-normalizing them
+STORED_VECTORS_NORMALIZED = True
 
 def get_allowed_states(jd_location):
-    city = jd_location.lower().split(",")[0].strip()
-    state = CITY_TO_STATE.get(city, city)
-    return [state] + NEIGHBOR_STATES.get(state, [])
+    # Unknown places still filter on their own (lower-cased) name
+    state = resolve_state(jd_location) or jd_location.lower().split(",")[0].strip()
+    return allowed_states(state)
 
 def parse_embedding(emb):
     if emb is None:
         return np.array([])
+    if isinstance(emb, np.ndarray):
+        return emb
     if isinstance(emb, str):
         try:
-            return np.array(ast.literal_eval(emb))
-        except:
+            return parse_vector_text(emb)
+        except ValueError:
             return np.array([])
-    return np.array(emb)
+    return np.asarray(emb, dtype=np.float32)
 
-def create_jd_section_embeddings(jd_text):
-    jd_structured = extract_structured_info_groq_jd(jd_text)
+def stack_embeddings(rows, first_col):
+    """Stack the section embeddings of ``rows`` into an (N, S, D) float32 array.
+
+    Embedding columns are expected in SECTIONS order starting at ``first_col``.
+    """
+    stacked = np.zeros((len(rows), len(SECTIONS), EMBEDDING_DIM), dtype=np.float32)
+    for i, row in enumerate(rows):
+        for j in range(len(SECTIONS)):
+            vec = parse_embedding(row[first_col + j])
+            if vec.shape == (EMBEDDING_DIM,):
+                stacked[i, j] = vec
+    return stacked
+
+def _jd_section_texts(jd_structured):
     resume_like = {
         'current_job_title': jd_structured.get('job_title', ''),
         'preferred_job_title': '',
@@ -79,14 +87,39 @@ def create_jd_section_embeddings(jd_text):
         'experience': [{'title': jd_structured.get('required_experience', '')}],
         'education': [{'degree': jd_structured.get('required_education', '')}],
     }
+    return [
+        ", ".join(resume_like['skills']),
+        " ".join(exp['title'] for exp in resume_like['experience']),
+        " ".join(edu['degree'] for edu in resume_like['education']),
+        resume_like['current_job_title'],
+    ]
 
-    embeddings = {
-        'skills': model.encode(", ".join(resume_like['skills'])),
-        'experience': model.encode(" ".join(exp['title'] for exp in resume_like['experience'])),
-        'education': model.encode(" ".join(edu['degree'] for edu in resume_like['education'])),
-        'job_titles': model.encode(resume_like['current_job_title'])
+def _jd_embeddings_from_vectors(vectors):
+    return {
+        'skills': vectors[0],
+        'experience': vectors[1],
+        'education': vectors[2],
+        'job_titles': vectors[3]
     }
 
+def create_jd_section_embeddings(jd_text):
+    cached = get_jd_cache().get(jd_text)
+    if cached is not None:
+        return cached
+    jd_structured = extract_structured_info_groq_jd(jd_text)
+    vectors = embedding_service.encode(_jd_section_texts(jd_structured))
+    embeddings = _jd_embeddings_from_vectors(vectors)
+    get_jd_cache().set(jd_text, embeddings, jd_structured)
+    return embeddings, jd_structured
+
+async def create_jd_section_embeddings_async(jd_text):
+    cached = await get_jd_cache().get_async(jd_text)
+    if cached is not None:
+        return cached
+    jd_structured = await extract_structured_info_groq_jd_async(jd_text)
+    vectors = await embedding_service.encode_async(_jd_section_texts(jd_structured))
+    embeddings = _jd_embeddings_from_vectors(vectors)
+    await get_jd_cache().set_async(jd_text, embeddings, jd_structured)
     return embeddings, jd_structured
 
 def calculate_weighted_similarity(jd_embeddings, resume_embeddings):
@@ -94,23 +127,17 @@ def calculate_weighted_similarity(jd_embeddings, resume_embeddings):
     total_weight = 0
     for section, weight in SECTION_WEIGHTS.items():
         if section in jd_embeddings and section in resume_embeddings:
-            jd_vec = jd_embeddings[section].reshape(1, -1)
-            res_vec = resume_embeddings[section].reshape(1, -1)
-            similarity = cosine_similarity(jd_vec, res_vec)[0][0]
-            total_similarity += similarity * weight
+            jd_vec, res_vec = l2_normalize(jd_embeddings[section]), l2_normalize(resume_embeddings[section])
+            total_similarity += float(jd_vec @ res_vec) * weight
             total_weight += weight
     return total_similarity / total_weight if total_weight > 0 else 0
 
-def find_matching_resumes_by_similarity(jd_text, top_n=None, debug=True):
-    jd_embeddings, jd_structured = create_jd_section_embeddings(jd_text)
-
-    raw_location = jd_structured.get("location", "").lower().strip()
+def resolve_allowed_states(jd_structured, debug=False):
+    raw_location = (jd_structured.get("location") or "").lower().strip()
     jd_location = re.sub(r"\(.*?\)", "", raw_location).strip()
     if debug:
         print(f"Cleaned JD location: '{jd_location}'")
 
-    job_title_vector = jd_embeddings['job_titles']
-
     if not jd_location:
         if debug:
             print("Location not found in JD.")
@@ -119,68 +146,561 @@ def find_matching_resumes_by_similarity(jd_text, top_n=None, debug=True):
     allowed_states = get_allowed_states(jd_location)
     if debug:
         print(f"Allowed states for filtering: {allowed_states}")
+    return allowed_states
+
+# Scoring only needs ids and vectors; display columns are fetched afterwards
+# for the winners alone (display_by_id_query)
+CANDIDATE_COLUMNS = """id, state,
+           skills_embedding, experience_embedding, education_embedding, job_titles_embedding"""
+# Index of the first embedding column in candidate rows, in SECTIONS order
+CANDIDATE_VECTORS_START = 2
+
+CANDIDATE_QUERY_TEMPLATE = f"""
+    SELECT {CANDIDATE_COLUMNS}
+    FROM resumes
+    WHERE state_norm = ANY(%s)
+    ORDER BY {{order_by}}
+    LIMIT %s;
+"""
+
+# ORDER BY expression of each single-list retrieval mode; must match the index expressions
+RETRIEVAL_ORDER_BY = {
+    "title": "job_titles_embedding <-> %s::vector",
+    "composite": "composite_embedding <-> %s::vector",
+    "halfvec": f"composite_embedding::halfvec({EMBEDDING_DIM}) <-> %s::vector::halfvec({EMBEDDING_DIM})",
+    "binary": f"binary_quantize(composite_embedding)::bit({EMBEDDING_DIM}) <~> binary_quantize(%s::vector)",
+}
+
+def _async_candidate_query(query):
+    # Same query with asyncpg-style placeholders
+    return query.replace("ANY(%s)", "ANY($1::text[])").replace("%s::vector", "$2::vector").replace("LIMIT %s", "LIMIT $3")
+
+SINGLE_LIST_QUERIES = {
+    mode: CANDIDATE_QUERY_TEMPLATE.format(order_by=order_by) for mode, order_by in RETRIEVAL_ORDER_BY.items()
+}
+SINGLE_LIST_QUERIES_ASYNC = {mode: _async_candidate_query(q) for mode, q in SINGLE_LIST_QUERIES.items()}
+
+CANDIDATES_BY_ID_QUERY = f"""
+    SELECT {CANDIDATE_COLUMNS}
+    FROM resumes
+    WHERE id = ANY(%s);
+"""
+CANDIDATES_BY_ID_QUERY_ASYNC = CANDIDATES_BY_ID_QUERY.replace("ANY(%s)", "ANY($1::int[])")
+
+STATE_COUNT_QUERY = "SELECT COUNT(*) FROM resumes WHERE state_norm = ANY(%s);"
+STATE_COUNT_QUERY_ASYNC = STATE_COUNT_QUERY.replace("ANY(%s)", "ANY($1::text[])")
+
+def _plan_search_mode(search_mode, available):
+    if search_mode != "auto":
+        return search_mode
+    return "exact" if available <= EXACT_SCAN_MAX_ROWS else "iterative"
+
+def multi_retrieval_query(params):
+    """UNION ALL of one ANN list per RETRIEVAL_SECTIONS entry, returning
+    (list index, id, rank) rows. ``params`` renders the placeholders:
+    [states, limit, one vector per section]."""
+    states, limit, vectors = params[0], params[1], params[2:]
+    parts = []
+    for i, (section, vec) in enumerate(zip(RETRIEVAL_SECTIONS, vectors)):
+        parts.append(f"""
+            SELECT {i} AS list, id, ROW_NUMBER() OVER (ORDER BY dist) AS rank
+            FROM (
+                SELECT id, {section}_embedding <-> {vec}::vector AS dist
+                FROM resumes
+                WHERE state_norm = ANY({states})
+                ORDER BY dist
+                LIMIT {limit}
+            ) s""")
+    return " UNION ALL ".join(parts) + ";"
 
-    conn = psycopg2.connect(**DB_CONFIG)
-    cur = conn.cursor()
+# Named placeholders: each value appears once per section list
+MULTI_RETRIEVAL_QUERY = multi_retrieval_query(
+    ["%(states)s", "%(limit)s"] + [f"%({section})s" for section in RETRIEVAL_SECTIONS]
+)
+MULTI_RETRIEVAL_QUERY_ASYNC = multi_retrieval_query(
+    ["$1::text[]", "$2"] + [f"${i + 3}" for i in range(len(RETRIEVAL_SECTIONS))]
+)
 
-    cur.execute("""
-        SELECT id, name, current_job_title, preferred_job_title, skills,
-               experience, education, location, state,
-               skills_embedding, experience_embedding, education_embedding, job_titles_embedding
-        FROM resumes
-        WHERE LOWER(state) = ANY(%s)
-        ORDER BY job_titles_embedding <-> %s::vector
-        LIMIT 300;
-    """, (allowed_states, job_title_vector.tolist()))
+def reciprocal_rank_fusion(ranked_rows, k=RRF_K, limit=CANDIDATE_POOL):
+    """Fuse (list index, id, rank) rows into one id list, best first.
 
-    results = cur.fetchall()
-    conn.close()
+    Each list contributes weight / (k + rank), weighted by the section's
+    SECTION_WEIGHTS entry so the fused order follows the final scorer.
+    """
+    list_weights = [SECTION_WEIGHTS.get(section, 1.0) for section in RETRIEVAL_SECTIONS]
+    fused = {}
+    for list_idx, resume_id, rank in ranked_rows:
+        fused[resume_id] = fused.get(resume_id, 0.0) + list_weights[list_idx] / (k + rank)
+    return sorted(fused, key=fused.get, reverse=True)[:limit]
 
-    if not results:
+def _multi_retrieval_params(allowed_states, jd_embeddings):
+    return [allowed_states, RETRIEVAL_PER_SECTION] + [jd_embeddings[s] for s in RETRIEVAL_SECTIONS]
+
+def _expected_candidates(retrieval, available):
+    # Each complete ANN list alone holds min(available, its LIMIT) rows
+    return min(available, RETRIEVAL_PER_SECTION if retrieval == "multi" else CANDIDATE_POOL)
+
+def jd_composite_vector(jd_embeddings):
+    return composite_vector(l2_normalize(jd_matrix(jd_embeddings)))
+
+def _single_list_query(retrieval, jd_embeddings, use_async=False):
+    query = (SINGLE_LIST_QUERIES_ASYNC if use_async else SINGLE_LIST_QUERIES)[retrieval]
+    if retrieval == "title":
+        return query, jd_embeddings['job_titles']
+    return query, jd_composite_vector(jd_embeddings)
+
+def _run_retrieval(cur, allowed_states, jd_embeddings, retrieval):
+    if retrieval != "multi":
+        query, vector = _single_list_query(retrieval, jd_embeddings)
+        cur.execute(query, (allowed_states, vector, CANDIDATE_POOL))
+        return cur.fetchall(), None
+    states, limit, *vectors = _multi_retrieval_params(allowed_states, jd_embeddings)
+    cur.execute(MULTI_RETRIEVAL_QUERY, {"states": states, "limit": limit, **dict(zip(RETRIEVAL_SECTIONS, vectors))})
+    ranked_rows = cur.fetchall()
+    ids = reciprocal_rank_fusion(ranked_rows)
+    if not ids:
+        return [], 0
+    cur.execute(CANDIDATES_BY_ID_QUERY, (ids,))
+    return cur.fetchall(), len({row[1] for row in ranked_rows})
+
+async def _run_retrieval_async(conn, allowed_states, jd_embeddings, retrieval):
+    if retrieval != "multi":
+        query, vector = _single_list_query(retrieval, jd_embeddings, use_async=True)
+        return await conn.fetch(query, allowed_states, vector, CANDIDATE_POOL), None
+    ranked_rows = await conn.fetch(MULTI_RETRIEVAL_QUERY_ASYNC, *_multi_retrieval_params(allowed_states, jd_embeddings))
+    ids = reciprocal_rank_fusion(ranked_rows)
+    if not ids:
+        return [], 0
+    rows = await conn.fetch(CANDIDATES_BY_ID_QUERY_ASYNC, ids)
+    return rows, len({row[1] for row in ranked_rows})
+
+def _short(mode, available, rows, distinct, retrieval):
+    found = len(rows) if distinct is None else distinct
+    return available is not None and mode != "exact" and found < _expected_candidates(retrieval, available)
+
+def fetch_candidates(cur, allowed_states, jd_embeddings, ef_search=DEFAULT_EF_SEARCH, probes=DEFAULT_PROBES,
+                     search_mode=DEFAULT_SEARCH_MODE, retrieval=DEFAULT_RETRIEVAL):
+    available = None
+    if search_mode == "auto":
+        cur.execute(STATE_COUNT_QUERY, (allowed_states,))
+        available = cur.fetchone()[0]
+    mode = _plan_search_mode(search_mode, available)
+
+    apply_ann_settings(cur, ann_search_settings(ef_search, probes, mode))
+    rows, distinct = _run_retrieval(cur, allowed_states, jd_embeddings, retrieval)
+
+    if _short(mode, available, rows, distinct, retrieval):
+        apply_ann_settings(cur, ann_search_settings(search_mode="exact"))
+        rows, _ = _run_retrieval(cur, allowed_states, jd_embeddings, retrieval)
+    return rows
+
+async def fetch_candidates_async(conn, allowed_states, jd_embeddings, ef_search=DEFAULT_EF_SEARCH,
+                                 probes=DEFAULT_PROBES, search_mode=DEFAULT_SEARCH_MODE,
+                                 retrieval=DEFAULT_RETRIEVAL):
+    """fetch_candidates for an asyncpg connection inside a transaction."""
+    available = None
+    if search_mode == "auto":
+        available = await conn.fetchval(STATE_COUNT_QUERY_ASYNC, allowed_states)
+    mode = _plan_search_mode(search_mode, available)
+
+    await apply_ann_settings_async(conn, ann_search_settings(ef_search, probes, mode))
+    rows, distinct = await _run_retrieval_async(conn, allowed_states, jd_embeddings, retrieval)
+
+    if _short(mode, available, rows, distinct, retrieval):
+        await apply_ann_settings_async(conn, ann_search_settings(search_mode="exact"))
+        rows, _ = await _run_retrieval_async(conn, allowed_states, jd_embeddings, retrieval)
+    return rows
+
+def _top_order(scores, top_n):
+    order = np.argsort(-scores, kind="stable")
+    return order if top_n is None else order[:top_n]
+
+def rank_candidates(jd_embeddings, rows, top_n=None):
+    """Best ``top_n`` candidate rows as (id, score) pairs; see hydrate_results."""
+    scores = score_candidates(jd_embeddings, stack_embeddings(rows, CANDIDATE_VECTORS_START),
+                              normalized=STORED_VECTORS_NORMALIZED)
+    return [(rows[idx][0], float(scores[idx])) for idx in _top_order(scores, top_n)]
+
+def rank_candidates_batch(jd_embeddings_list, rows, candidate_ids_list, top_n=None):
+    """rank_candidates for several JDs whose candidate rows were fetched
+    together; each JD is scored only against its own ``candidate_ids``."""
+    candidates = stack_embeddings(rows, CANDIDATE_VECTORS_START)
+    position = {row[0]: i for i, row in enumerate(rows)}
+    ranked = []
+    for jd_embeddings, candidate_ids in zip(jd_embeddings_list, candidate_ids_list):
+        idx = np.fromiter((position[c] for c in candidate_ids if c in position), dtype=np.int64)
+        scores = score_candidates(jd_embeddings, candidates[idx], normalized=STORED_VECTORS_NORMALIZED)
+        ranked.append([(rows[idx[j]][0], float(scores[j])) for j in _top_order(scores, top_n)])
+    return ranked
+
+def print_matches(top_results):
+    for i, res in enumerate(top_results, start=1):
+        print(f"\nMatch #{i}")
+        print(f"Name: {res['name']}")
+        print(f"Current Title: {res['current_job_title']}")
+        print(f"Preferred Title: {res['preferred_job_title']}")
+        print(f"Location: {res['location']} ({res['state']})")
+        print(f"Skills: {res['skills']}")
+        print(f"Weighted Similarity Score: {res['similarity_score']:.4f}")
+        print(f"Experience: {len(res['experience']) if res['experience'] else 0} positions")
+        print(f"Education: {len(res['education']) if res['education'] else 0} degrees")
+
+def _rank_rows(jd_embeddings, rows, top_n, debug=False):
+    if not rows:
         if debug:
             print("No resumes matched ANN + state filter.")
         return []
+    return rank_candidates(jd_embeddings, rows, top_n)
+
+def find_matching_resumes_by_similarity(jd_text, top_n=None, debug=True, ef_search=DEFAULT_EF_SEARCH,
+                                        probes=DEFAULT_PROBES, search_mode=DEFAULT_SEARCH_MODE,
+                                        retrieval=DEFAULT_RETRIEVAL):
+    jd_embeddings, jd_structured = create_jd_section_embeddings(jd_text)
+
+    allowed_states = resolve_allowed_states(jd_structured, debug)
+    if not allowed_states:
+        return []
+
+    key = result_key(jd_embeddings, allowed_states, top_n, ef_search=ef_search, probes=probes,
+                     search_mode=search_mode, retrieval=retrieval)
+    top_results = get_result_cache().get(key)
+    if top_results is None:
+        generation = get_corpus_generation()
+        with db_connection() as conn, conn.cursor() as cur:
+            rows = fetch_candidates(cur, allowed_states, jd_embeddings, ef_search, probes, search_mode, retrieval)
+            top_results = hydrate_results(cur, _rank_rows(jd_embeddings, rows, top_n, debug))
+        get_result_cache().set(key, top_results, generation)
+
+    if debug:
+        print_matches(top_results)
+    return top_results
+
+async def find_matching_resumes_by_similarity_async(jd_text, top_n=None, debug=False, ef_search=DEFAULT_EF_SEARCH,
+                                                    probes=DEFAULT_PROBES, search_mode=DEFAULT_SEARCH_MODE,
+                                                    retrieval=DEFAULT_RETRIEVAL):
+    """Non-blocking variant for the API: async LLM client, encoder thread pool
+    and asyncpg. Scoring is a single matmul and stays on the event loop."""
+    jd_embeddings, jd_structured = await create_jd_section_embeddings_async(jd_text)
+
+    allowed_states = resolve_allowed_states(jd_structured, debug)
+    if not allowed_states:
+        return []
 
-    resume_scores = []
-    for row in results:
-        resume_id, name, current_job_title, preferred_job_title, skills, experience, education, location, state, \
-        skills_emb, experience_emb, education_emb, job_titles_emb = row
-
-        resume_embeddings = {
-            'skills': parse_embedding(skills_emb),
-            'experience': parse_embedding(experience_emb),
-            'education': parse_embedding(education_emb),
-            'job_titles': parse_embedding(job_titles_emb)
-        }
-
-        score = calculate_weighted_similarity(jd_embeddings, resume_embeddings)
-
-        resume_scores.append({
-            'id': resume_id,
-            'name': name,
-            'current_job_title': current_job_title,
-            'preferred_job_title': preferred_job_title,
-            'skills': skills,
-            'experience': experience,
-            'education': education,
-            'location': location,
-            'state': state,
-            'similarity_score': score
-        })
-
-    resume_scores.sort(key=lambda x: x['similarity_score'], reverse=True)
-    top_results = resume_scores if top_n is None else resume_scores[:top_n]
+    key = result_key(jd_embeddings, allowed_states, top_n, ef_search=ef_search, probes=probes,
+                     search_mode=search_mode, retrieval=retrieval)
+    top_results = get_result_cache().get(key)
+    if top_results is None:
+        generation = get_corpus_generation()
+        pool = await get_async_pool()
+        async with pool.acquire() as conn, conn.transaction():
+            rows = await fetch_candidates_async(
+                conn, allowed_states, jd_embeddings, ef_search, probes, search_mode, retrieval
+            )
+            top_results = await hydrate_results_async(_rank_rows(jd_embeddings, rows, top_n, debug), conn=conn)
+        get_result_cache().set(key, top_results, generation)
 
     if debug:
-        for i, res in enumerate(top_results, start=1):
-            print(f"\nMatch #{i}")
-            print(f"Name: {res['name']}")
-            print(f"Current Title: {res['current_job_title']}")
-            print(f"Preferred Title: {res['preferred_job_title']}")
-            print(f"Location: {res['location']} ({res['state']})")
-            print(f"Skills: {res['skills']}")
-            print(f"Weighted Similarity Score: {res['similarity_score']:.4f}")
-            print(f"Experience: {len(res['experience']) if res['experience'] else 0} positions")
-            print(f"Education: {len(res['education']) if res['education'] else 0} degrees")
+        print_matches(top_results)
+    return top_results
+
+# ------------------- Ranked ids + projected hydration -------------------
+# Paged and streamed matching rank once into (id, score) pairs, then fetch
+# only the requested display columns for the slice being returned.
+RESULT_FIELDS = ("id", "name", "current_job_title", "preferred_job_title", "skills",
+                 "experience", "education", "location", "state")
+# Deepest rank a cursor can page to
+MAX_RANKED_RESULTS = 500
+
+def validate_fields(fields):
+    unknown = [field for field in fields if field not in RESULT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown result fields {unknown}; expected a subset of {RESULT_FIELDS}")
+
+def display_by_id_query(fields=RESULT_FIELDS, use_async=False):
+    columns = ", ".join(["id"] + [field for field in fields if field != "id"])
+    ids = "$1::int[]" if use_async else "%s"
+    return f"SELECT {columns} FROM resumes WHERE id = ANY({ids});"
+
+def _project(ranked, rows, fields):
+    columns = [field for field in fields if field != "id"]
+    rows_by_id = {row[0]: tuple(row)[1:] for row in rows}
+    results = []
+    for resume_id, score in ranked:
+        # Rows deleted since ranking are dropped
+        if resume_id not in rows_by_id:
+            continue
+        results.append({"id": resume_id, **dict(zip(columns, rows_by_id[resume_id])),
+                        "similarity_score": float(score)})
+    return results
+
+def _ids_only(fields):
+    return all(field == "id" for field in fields)
+
+def fetch_display_rows(cur, ids, fields=RESULT_FIELDS):
+    cur.execute(display_by_id_query(fields), (list(ids),))
+    return cur.fetchall()
+
+async def fetch_display_rows_async(ids, fields=RESULT_FIELDS, conn=None):
+    if conn is not None:
+        return await conn.fetch(display_by_id_query(fields, use_async=True), list(ids))
+    pool = await get_async_pool()
+    async with pool.acquire() as conn:
+        return await conn.fetch(display_by_id_query(fields, use_async=True), list(ids))
+
+def hydrate_results(cur, ranked, fields=RESULT_FIELDS):
+    """Turn ranked (id, score) pairs into result dicts holding ``fields``."""
+    if not ranked:
+        return []
+    if _ids_only(fields):
+        return [{"id": resume_id, "similarity_score": float(score)} for resume_id, score in ranked]
+    return _project(ranked, fetch_display_rows(cur, [resume_id for resume_id, _ in ranked], fields), fields)
+
+async def hydrate_results_async(ranked, fields=RESULT_FIELDS, conn=None):
+    if not ranked:
+        return []
+    if _ids_only(fields):
+        return [{"id": resume_id, "similarity_score": float(score)} for resume_id, score in ranked]
+    rows = await fetch_display_rows_async([resume_id for resume_id, _ in ranked], fields, conn)
+    return _project(ranked, rows, fields)
+
+async def rank_matches_async(jd_text, limit=MAX_RANKED_RESULTS, ef_search=DEFAULT_EF_SEARCH, probes=DEFAULT_PROBES,
+                             search_mode=DEFAULT_SEARCH_MODE, retrieval=DEFAULT_RETRIEVAL):
+    """Best ``limit`` (id, score) pairs for ``jd_text`` and the corpus
+    generation they were ranked at (cursors are only valid within it)."""
+    jd_embeddings, jd_structured = await create_jd_section_embeddings_async(jd_text)
+    generation = get_corpus_generation()
+    allowed_states = resolve_allowed_states(jd_structured)
+    if not allowed_states:
+        return [], generation
 
+    key = result_key(jd_embeddings, allowed_states, limit, kind="ranked", ef_search=ef_search, probes=probes,
+                     search_mode=search_mode, retrieval=retrieval)
+    ranked = get_result_cache().get(key)
+    if ranked is None:
+        pool = await get_async_pool()
+        async with pool.acquire() as conn, conn.transaction():
+            rows = await fetch_candidates_async(
+                conn, allowed_states, jd_embeddings, ef_search, probes, search_mode, retrieval
+            )
+        ranked = _rank_rows(jd_embeddings, rows, limit)
+        get_result_cache().set(key, ranked, generation)
+    return ranked, generation
+
+# ------------------- Snapshot (mmap) matching -------------------
+def find_matching_resumes_in_snapshot(jd_text, top_n=None, debug=True, snapshot=None):
+    """Score against the memory-mapped embedding snapshot (see mmap_engine.py)
+    instead of Postgres; only the display columns of the winners are fetched."""
+    from mmap_engine import get_snapshot
+
+    jd_embeddings, jd_structured = create_jd_section_embeddings(jd_text)
+    allowed_states = resolve_allowed_states(jd_structured, debug)
+    if not allowed_states:
+        return []
+
+    snapshot = snapshot or get_snapshot()
+    meta = snapshot.view.meta
+    key = result_key(jd_embeddings, allowed_states, top_n, engine="mmap", snapshot_rows=meta["count"],
+                     snapshot_max_id=meta["max_id"], snapshot_version=meta.get("version"))
+    top_results = get_result_cache().get(key)
+    if top_results is None:
+        generation = get_corpus_generation()
+        top_results = _snapshot_results(snapshot, jd_embeddings, allowed_states, top_n, debug)
+        get_result_cache().set(key, top_results, generation)
+
+    if debug:
+        print_matches(top_results)
     return top_results
+
+def _snapshot_results(snapshot, jd_embeddings, allowed_states, top_n, debug):
+    ids, scores = snapshot.search(jd_embeddings, allowed_states, top_n)
+    if len(ids) == 0:
+        if debug:
+            print("No resumes in the snapshot matched the state filter.")
+        return []
+
+    with db_connection() as conn, conn.cursor() as cur:
+        return hydrate_results(cur, list(zip(ids.tolist(), scores.tolist())))
+
+def rank_matches_in_snapshot(jd_text, limit=MAX_RANKED_RESULTS, snapshot=None):
+    """rank_matches_async against the embedding snapshot."""
+    from mmap_engine import get_snapshot
+
+    jd_embeddings, jd_structured = create_jd_section_embeddings(jd_text)
+    generation = get_corpus_generation()
+    allowed_states = resolve_allowed_states(jd_structured)
+    if not allowed_states:
+        return [], generation
+    ids, scores = (snapshot or get_snapshot()).search(jd_embeddings, allowed_states, limit)
+    return list(zip(ids.tolist(), scores.tolist())), generation
+
+# ------------------- Batch matching -------------------
+def _group_by_allowed_states(jd_structured_list):
+    """Map frozenset(allowed_states) -> list of JD indexes sharing that filter."""
+    groups = {}
+    for i, jd_structured in enumerate(jd_structured_list):
+        allowed_states = resolve_allowed_states(jd_structured)
+        if allowed_states:
+            groups.setdefault(frozenset(allowed_states), []).append(i)
+    return groups
+
+def _batch_jd_embeddings(jd_structured_list, vectors):
+    n_sections = len(SECTIONS)
+    return [
+        _jd_embeddings_from_vectors(vectors[i * n_sections:(i + 1) * n_sections])
+        for i in range(len(jd_structured_list))
+    ]
+
+def _batch_jd_texts(jd_structured_list):
+    return [text for jd_structured in jd_structured_list for text in _jd_section_texts(jd_structured)]
+
+def _chunk_candidate_ids_query(n_vectors, params):
+    """One ANN pass per JD title vector in a single round-trip; returns
+    (JD ordinal, candidate id) rows. ``params`` renders the placeholders."""
+    vectors = ", ".join(f"{p}::vector" for p in params[:n_vectors])
+    states, limit = params[n_vectors], params[n_vectors + 1]
+    return f"""
+        SELECT q.jd, c.id
+        FROM unnest(ARRAY[{vectors}]) WITH ORDINALITY AS q(vec, jd)
+        CROSS JOIN LATERAL (
+            SELECT id FROM resumes
+            WHERE state_norm = ANY({states})
+            ORDER BY job_titles_embedding <-> q.vec
+            LIMIT {limit}
+        ) c;
+    """
+
+
+def _batch_search_mode(search_mode):
+    # The union query covers many JDs at once, so "auto" runs as an iterative scan
+    return "iterative" if search_mode == "auto" else search_mode
+
+def find_matching_resumes_batch(jd_texts, top_n=5, ef_search=DEFAULT_EF_SEARCH, probes=DEFAULT_PROBES,
+                                search_mode=DEFAULT_SEARCH_MODE, retrieval=DEFAULT_RETRIEVAL):
+    """Match many JDs at once.
+
+    JDs are extracted concurrently and all their sections are encoded in one
+    batch. JDs with the same allowed states are split into BATCH_JD_CHUNK
+    sized chunks, each fetched on one connection and scored off the event
+    loop; every JD is scored against its own candidates only. ``retrieval``
+    works as in find_matching_resumes_by_similarity, so a JD ranks the same
+    here as on its own; "title" instead shares one job-title ANN query per
+    chunk (cheapest, but title-only recall). Returns one result list per JD,
+    in input order.
+    """
+    ann = dict(ef_search=ef_search, probes=probes, search_mode=search_mode, retrieval=retrieval)
+
+    async def fetch_chunk(allowed_states, jd_chunk):
+        return await asyncio.to_thread(_fetch_chunk_candidates, allowed_states, jd_chunk, ann)
+
+    async def fetch_display(ids):
+        return await asyncio.to_thread(_fetch_display_rows, ids)
+
+    return run_sync(_match_batch(jd_texts, top_n, fetch_chunk, fetch_display, BATCH_DB_CONCURRENCY))
+
+async def find_matching_resumes_batch_async(jd_texts, top_n=5, ef_search=DEFAULT_EF_SEARCH, probes=DEFAULT_PROBES,
+                                            search_mode=DEFAULT_SEARCH_MODE, retrieval=DEFAULT_RETRIEVAL):
+    ann = dict(ef_search=ef_search, probes=probes, search_mode=search_mode, retrieval=retrieval)
+
+    async def fetch_chunk(allowed_states, jd_chunk):
+        return await _fetch_chunk_candidates_async(allowed_states, jd_chunk, ann)
+
+    return await _match_batch(jd_texts, top_n, fetch_chunk, fetch_display_rows_async, BATCH_DB_CONCURRENCY_ASYNC)
+
+async def _prepare_batch_jds(jd_texts):
+    """(embeddings, structured) per JD; cache misses are extracted concurrently
+    and encoded together in one batch."""
+    cache = get_jd_cache()
+    prepared = list(await asyncio.gather(*(cache.get_async(t) for t in jd_texts)))
+    missing = [i for i, entry in enumerate(prepared) if entry is None]
+    if missing:
+        structured = await asyncio.gather(*(extract_structured_info_groq_jd_async(jd_texts[i]) for i in missing))
+        vectors = await embedding_service.encode_async(_batch_jd_texts(structured))
+        for i, jd_structured, embeddings in zip(missing, structured, _batch_jd_embeddings(structured, vectors)):
+            await cache.set_async(jd_texts[i], embeddings, jd_structured)
+            prepared[i] = (embeddings, jd_structured)
+    return [entry[0] for entry in prepared], [entry[1] for entry in prepared]
+
+async def _match_batch(jd_texts, top_n, fetch_chunk, fetch_display, concurrency):
+    jd_embeddings_list, jd_structured_list = await _prepare_batch_jds(jd_texts)
+
+    chunks = [
+        (states, indexes[start:start + BATCH_JD_CHUNK])
+        for states, indexes in _group_by_allowed_states(jd_structured_list).items()
+        for start in range(0, len(indexes), BATCH_JD_CHUNK)
+    ]
+    ranked = [[] for _ in jd_texts]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def rank_chunk(states, indexes):
+        async with semaphore:
+            jd_list = [jd_embeddings_list[i] for i in indexes]
+            rows, candidate_ids = await fetch_chunk(list(states), jd_list)
+            if not rows:
+                return
+            # Stacking and scoring a chunk takes ~100 ms, so it runs in a
+            # thread; it holds the slot so at most ``concurrency`` chunks of
+            # candidate rows are in memory at once
+            chunk_ranked = await asyncio.to_thread(rank_candidates_batch, jd_list, rows, candidate_ids, top_n)
+            for i, pairs in zip(indexes, chunk_ranked):
+                ranked[i] = pairs
+
+    await asyncio.gather(*(rank_chunk(states, indexes) for states, indexes in chunks))
+
+    # Display columns for every JD's winners in one round-trip
+    ids = {resume_id for pairs in ranked for resume_id, _ in pairs}
+    display_rows = await fetch_display(ids) if ids else []
+    return [_project(pairs, display_rows, RESULT_FIELDS) for pairs in ranked]
+
+def _fetch_display_rows(ids):
+    with db_connection() as conn, conn.cursor() as cur:
+        return fetch_display_rows(cur, ids)
+
+def _split_candidate_ids(n_jds, pairs):
+    """Per-JD candidate id lists and their union from (JD ordinal, id) rows."""
+    candidate_ids = [[] for _ in range(n_jds)]
+    for jd, resume_id in pairs:
+        candidate_ids[jd - 1].append(resume_id)
+    return candidate_ids, list({resume_id for _, resume_id in pairs})
+
+def _merge_candidates(rows_per_jd):
+    """(union candidate rows, candidate ids per JD) from per-JD row lists."""
+    union = {}
+    for rows in rows_per_jd:
+        for row in rows:
+            union.setdefault(row[0], row)
+    return list(union.values()), [[row[0] for row in rows] for rows in rows_per_jd]
+
+def _title_chunk_query(n, use_async=False):
+    if use_async:
+        return _chunk_candidate_ids_query(n, [f"${i}" for i in range(1, n + 1)] + [f"${n + 1}::text[]", f"${n + 2}"])
+    return _chunk_candidate_ids_query(n, ["%s"] * (n + 2))
+
+def _fetch_chunk_candidates(allowed_states, jd_chunk, ann):
+    """(union candidate rows, candidate ids per JD) for one chunk of JDs."""
+    with db_connection() as conn, conn.cursor() as cur:
+        if ann["retrieval"] != "title":
+            return _merge_candidates([fetch_candidates(cur, allowed_states, jd, **ann) for jd in jd_chunk])
+        n = len(jd_chunk)
+        apply_ann_settings(cur, ann_search_settings(ann["ef_search"], ann["probes"],
+                                                    _batch_search_mode(ann["search_mode"])))
+        cur.execute(_title_chunk_query(n), (*[jd['job_titles'] for jd in jd_chunk], allowed_states, CANDIDATE_POOL))
+        candidate_ids, ids = _split_candidate_ids(n, cur.fetchall())
+        if not ids:
+            return [], candidate_ids
+        cur.execute(CANDIDATES_BY_ID_QUERY, (ids,))
+        return cur.fetchall(), candidate_ids
+
+async def _fetch_chunk_candidates_async(allowed_states, jd_chunk, ann):
+    pool = await get_async_pool()
+    async with pool.acquire() as conn, conn.transaction():
+        if ann["retrieval"] != "title":
+            return _merge_candidates([await fetch_candidates_async(conn, allowed_states, jd, **ann) for jd in jd_chunk])
+        n = len(jd_chunk)
+        await apply_ann_settings_async(conn, ann_search_settings(ann["ef_search"], ann["probes"],
+                                                                 _batch_search_mode(ann["search_mode"])))
+        pairs = await conn.fetch(_title_chunk_query(n, use_async=True),
+                                 *[jd['job_titles'] for jd in jd_chunk], allowed_states, CANDIDATE_POOL)
+        candidate_ids, ids = _split_candidate_ids(n, pairs)
+        if not ids:
+            return [], candidate_ids
+        return await conn.fetch(CANDIDATES_BY_ID_QUERY_ASYNC, ids), candidate_ids
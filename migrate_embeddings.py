@@ -0,0 +1,97 @@
+"""Backfill normalized section vectors and the weighted composite vector.
+
+Rows whose embedding_version differs from scoring.weights_version() are
+rewritten in id order, one committed batch at a time, so the job is
+incremental (changing SECTION_WEIGHTS only touches stale rows) and can be
+interrupted and re-run safely. Vector indexes that do not exist yet (notably
+the composite one, on a first run) are built after the rows are written.
+
+    python migrate_embeddings.py [--batch-size 1000] [--quantized-indexes]
+"""
+import argparse
+import time
+import numpy as np
+from psycopg2.extras import execute_values
+from db import get_db_connection, create_updated_table, create_vector_indexes, create_quantized_indexes, \
+    EMBEDDING_SECTIONS, section_embeddings_to_row_vectors
+from scoring import EMBEDDING_DIM, weights_version
+from result_cache import bump_corpus_generation
+
+SELECT_STALE = f"""
+    SELECT id, {", ".join(f"{section}_embedding" for section in EMBEDDING_SECTIONS)}
+    FROM resumes
+    WHERE id > %s AND embedding_version IS DISTINCT FROM %s
+    ORDER BY id
+    LIMIT %s
+"""
+
+UPDATE_VECTORS = f"""
+    UPDATE resumes AS r SET
+        {", ".join(f"{section}_embedding = v.{section}::vector" for section in EMBEDDING_SECTIONS)},
+        composite_embedding = v.composite::vector,
+        embedding_version = v.version
+    FROM (VALUES %s) AS v (id, {", ".join(EMBEDDING_SECTIONS)}, composite, version)
+    WHERE r.id = v.id
+"""
+UPDATE_TEMPLATE = "(%s, " + "%s::float4[], " * (len(EMBEDDING_SECTIONS) + 1) + "%s)"
+
+def count_stale(conn, version):
+    with conn.cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM resumes WHERE embedding_version IS DISTINCT FROM %s", (version,))
+        return cur.fetchone()[0]
+
+def migrate(batch_size=1000, quantized_indexes=False):
+    create_updated_table(vector_indexes=False)
+    version = weights_version()
+    conn = get_db_connection()
+    total = count_stale(conn, version)
+    print(f"{total} rows need embedding version {version}.")
+
+    last_id, done, start = 0, 0, time.perf_counter()
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(SELECT_STALE, (last_id, version, batch_size))
+            rows = cur.fetchall()
+        if not rows:
+            break
+
+        vectors = np.zeros((len(rows), len(EMBEDDING_SECTIONS), EMBEDDING_DIM), dtype=np.float32)
+        missing = np.zeros((len(rows), len(EMBEDDING_SECTIONS)), dtype=bool)
+        for i, row in enumerate(rows):
+            for j, vec in enumerate(row[1:]):
+                if vec is None:
+                    missing[i, j] = True
+                else:
+                    vectors[i, j] = vec
+
+        values = []
+        for (resume_id, *_), recomputed, row_missing in zip(rows, section_embeddings_to_row_vectors(vectors), missing):
+            sections = [None if row_missing[j] else recomputed[s] for j, s in enumerate(EMBEDDING_SECTIONS)]
+            values.append((resume_id, *sections, recomputed["composite"], version))
+
+        with conn.cursor() as cur:
+            execute_values(cur, UPDATE_VECTORS, values, template=UPDATE_TEMPLATE, page_size=batch_size)
+        conn.commit()
+        bump_corpus_generation()
+
+        last_id = rows[-1][0]
+        done += len(rows)
+        print(f"  {done}/{total} rows ({done / (time.perf_counter() - start):.0f} rows/s)", end="\r")
+
+    print(f"\nEmbedding migration complete: {done} rows updated.")
+    conn.close()
+
+    create_vector_indexes()
+    if quantized_indexes:
+        create_quantized_indexes()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--quantized-indexes", action="store_true",
+                        help="also build the halfvec/binary composite indexes afterwards")
+    args = parser.parse_args()
+    migrate(args.batch_size, args.quantized_indexes)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""Postgres-free scoring over a memory-mapped snapshot of resume embeddings.
+
+A snapshot directory holds the four scoring section vectors of every resume
+as one (N, S, D) array (float32, float16 or int8 with per-vector scales),
+plus resume ids and state codes. Files are opened with np.memmap, so every
+uvicorn worker on the host shares the same pages through the page cache.
+
+The data files live in a version directory (``v000001``, ...) named by the
+top-level ``meta.json``, which is replaced atomically last. A refresh only
+appends to the current version; a rebuild writes a new version and
+publishes it with that one rename, so mapped files are never truncated under
+a reader and readers never see a partial refresh.
+
+    python mmap_engine.py rebuild [--dtype float16]
+    python mmap_engine.py refresh          # append resumes with new ids
+"""
+import os
+import json
+import shutil
+import argparse
+import threading
+import numpy as np
+from db import get_db_connection
+from llm_cache import CACHE_DIR
+from scoring import SECTIONS, EMBEDDING_DIM, score_candidates
+
+SNAPSHOT_DIR = os.environ.get("EMBEDDING_SNAPSHOT_DIR", os.path.join(CACHE_DIR, "embedding_snapshot"))
+SNAPSHOT_DTYPES = ("float32", "float16", "int8")
+FETCH_BATCH = 10_000
+SEARCH_CHUNK = 8192
+
+FILES = {
+    "vectors": "vectors.bin",
+    "scales": "scales.bin",
+    "ids": "ids.bin",
+    "states": "state_codes.bin",
+}
+
+SNAPSHOT_QUERY = f"""
+    SELECT id, state_norm, {", ".join(f"{section}_embedding" for section in SECTIONS)}
+    FROM resumes
+    WHERE id > %s
+    ORDER BY id
+"""
+
+# ------------------- Writing -------------------
+def _quantize(vectors, dtype):
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=-1) / 127.0
+        safe = np.where(scales > 0, scales, 1.0)
+        codes = np.rint(vectors / safe[..., None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    return vectors.astype(dtype), None
+
+def _load_meta(path):
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+def _write_meta(path, meta):
+    tmp = os.path.join(path, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(path, "meta.json"))
+
+def _data_dir(path, meta):
+    # Snapshots written before versioning keep their files in ``path`` itself
+    return os.path.join(path, meta.get("version", ""))
+
+def _new_version(path):
+    versions = [name for name in os.listdir(path) if name.startswith("v") and name[1:].isdigit()]
+    number = max((int(name[1:]) for name in versions), default=0) + 1
+    version = f"v{number:06d}"
+    os.makedirs(os.path.join(path, version))
+    return version
+
+def _remove_old_versions(path, keep):
+    """Delete version directories other than ``keep``. Workers still mapping
+    the previous version move off it on their next reload_if_changed, so it is
+    left for the rebuild after this one; unlinking a mapped file is safe on
+    POSIX anyway, only truncating it is not."""
+    for name in os.listdir(path):
+        if name.startswith("v") and name[1:].isdigit() and name not in keep:
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+def _truncate_to(data_dir, meta):
+    # Drop bytes a crashed refresh appended past the committed row count;
+    # readers only map the first ``count`` rows, so this never touches them
+    count = meta["count"]
+    itemsize = np.dtype(meta["dtype"]).itemsize
+    sizes = {
+        "vectors": count * len(SECTIONS) * EMBEDDING_DIM * itemsize,
+        "scales": count * len(SECTIONS) * 4,
+        "ids": count * 8,
+        "states": count * 2,
+    }
+    for key, size in sizes.items():
+        file_path = os.path.join(data_dir, FILES[key])
+        if os.path.exists(file_path) and os.path.getsize(file_path) > size:
+            with open(file_path, "r+b") as f:
+                f.truncate(size)
+
+def refresh_snapshot(path=SNAPSHOT_DIR, dtype=None, rebuild=False):
+    """Append every resume with an id above the snapshot's max id.
+
+    Existing rows are not revisited; use ``rebuild`` after bulk updates such
+    as migrate_embeddings.py or a state backfill. A rebuild goes to a new
+    version directory and never touches the files live readers have mapped.
+    """
+    os.makedirs(path, exist_ok=True)
+    current = _load_meta(path)
+    meta = None if rebuild else current
+    if meta is None:
+        meta = {"count": 0, "max_id": 0, "dtype": dtype or "float32", "dim": EMBEDDING_DIM,
+                "sections": SECTIONS, "states": [], "version": _new_version(path)}
+        for name in FILES.values():
+            open(os.path.join(path, meta["version"], name), "wb").close()
+    elif dtype and dtype != meta["dtype"]:
+        raise ValueError(f"Snapshot is {meta['dtype']}; rebuild to change dtype")
+    data_dir = _data_dir(path, meta)
+    _truncate_to(data_dir, meta)
+
+    state_codes = {state: i for i, state in enumerate(meta["states"])}
+    conn = get_db_connection()
+    added = 0
+    try:
+        with conn.cursor(name="embedding_snapshot") as cur, \
+                open(os.path.join(data_dir, FILES["vectors"]), "ab") as f_vectors, \
+                open(os.path.join(data_dir, FILES["scales"]), "ab") as f_scales, \
+                open(os.path.join(data_dir, FILES["ids"]), "ab") as f_ids, \
+                open(os.path.join(data_dir, FILES["states"]), "ab") as f_states:
+            cur.itersize = FETCH_BATCH
+            cur.execute(SNAPSHOT_QUERY, (meta["max_id"],))
+            while True:
+                rows = cur.fetchmany(FETCH_BATCH)
+                if not rows:
+                    break
+                vectors = np.zeros((len(rows), len(SECTIONS), EMBEDDING_DIM), dtype=np.float32)
+                codes = np.empty(len(rows), dtype=np.int16)
+                for i, (_, state, *embeddings) in enumerate(rows):
+                    for j, vec in enumerate(embeddings):
+                        if vec is not None:
+                            vectors[i, j] = vec
+                    if state is None:
+                        codes[i] = -1
+                    else:
+                        if state not in state_codes:
+                            state_codes[state] = len(meta["states"])
+                            meta["states"].append(state)
+                        codes[i] = state_codes[state]
+
+                quantized, scales = _quantize(vectors, meta["dtype"])
+                f_vectors.write(quantized.tobytes())
+                if scales is not None:
+                    f_scales.write(scales.tobytes())
+                f_ids.write(np.array([row[0] for row in rows], dtype=np.int64).tobytes())
+                f_states.write(codes.tobytes())
+                added += len(rows)
+                meta["max_id"] = rows[-1][0]
+
+            for f in (f_vectors, f_scales, f_ids, f_states):
+                f.flush()
+                os.fsync(f.fileno())
+    finally:
+        conn.close()
+
+    meta["count"] += added
+    _write_meta(path, meta)
+    if meta is not current:
+        # Keep the version just replaced for readers that have not reloaded yet
+        _remove_old_versions(path, keep={meta["version"], (current or {}).get("version")})
+    print(f"Embedding snapshot: +{added} rows, {meta['count']} total ({meta['dtype']}) at {data_dir}")
+    return meta
+
+# ------------------- Reading / search -------------------
+class SnapshotView:
+    """One published snapshot version, mapped. Never mutated: a reload builds
+    a new view, so a search always pairs vectors, ids and states of the same
+    version."""
+
+    def __init__(self, path):
+        meta = _load_meta(path)
+        if meta is None:
+            raise FileNotFoundError(f"No embedding snapshot at {path}; run `python mmap_engine.py rebuild`")
+        n = meta["count"]
+        shape = (n, len(meta["sections"]), meta["dim"])
+        data_dir = _data_dir(path, meta)
+
+        def mapped(key, dtype, shape):
+            if n == 0:
+                return np.zeros(shape, dtype=dtype)
+            return np.memmap(os.path.join(data_dir, FILES[key]), dtype=dtype, mode="r", shape=shape)
+
+        self.meta = meta
+        self.data_dir = data_dir
+        self.vectors = mapped("vectors", meta["dtype"], shape)
+        self.scales = mapped("scales", np.float32, shape[:2]) if meta["dtype"] == "int8" else None
+        self.ids = mapped("ids", np.int64, (n,))
+        self.state_codes = mapped("states", np.int16, (n,))
+        self.state_index = {state: i for i, state in enumerate(meta["states"])}
+
+    def dequantize(self, rows):
+        vectors = np.asarray(self.vectors[rows], dtype=np.float32)
+        if self.scales is not None:
+            vectors *= self.scales[rows][..., None]
+        return vectors
+
+class EmbeddingSnapshot:
+    """Read-only, memory-mapped view of a snapshot directory."""
+
+    def __init__(self, path=SNAPSHOT_DIR):
+        self.path = path
+        self._lock = threading.Lock()
+        self._meta_mtime = None
+        self.reload()
+
+    def reload(self):
+        # stat before reading so a refresh landing in between is picked up next time
+        mtime = os.path.getmtime(os.path.join(self.path, "meta.json"))
+        self.view = SnapshotView(self.path)
+        self._meta_mtime = mtime
+
+    def reload_if_changed(self):
+        mtime = os.path.getmtime(os.path.join(self.path, "meta.json"))
+        if mtime != self._meta_mtime:
+            with self._lock:
+                if mtime != self._meta_mtime:
+                    self.reload()
+
+    @property
+    def meta(self):
+        return self.view.meta
+
+    def file_path(self, key):
+        return os.path.join(self.view.data_dir, FILES[key])
+
+    def __len__(self):
+        return self.view.meta["count"]
+
+    def _dequantize(self, rows):
+        return self.view.dequantize(rows)
+
+    def search(self, jd_embeddings, allowed_states=None, top_n=10, chunk=SEARCH_CHUNK):
+        """Brute-force weighted scoring over the rows in ``allowed_states``.
+
+        Returns (ids, scores) arrays, best first; ``top_n=None`` keeps all.
+        """
+        view = self.view  # one version for the whole search
+        if allowed_states is None:
+            rows = np.arange(view.meta["count"])
+        else:
+            codes = [view.state_index[s] for s in allowed_states if s in view.state_index]
+            rows = np.flatnonzero(np.isin(view.state_codes, codes))
+
+        top_n = len(rows) if top_n is None else top_n
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, len(rows), chunk):
+            chunk_rows = rows[start:start + chunk]
+            scores = score_candidates(jd_embeddings, view.dequantize(chunk_rows), normalized=True)
+            best_rows = np.concatenate([best_rows, chunk_rows])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > top_n:
+                keep = np.argpartition(-best_scores, top_n)[:top_n]
+                best_rows, best_scores = best_rows[keep], best_scores[keep]
+
+        order = np.argsort(-best_scores, kind="stable")
+        return np.asarray(view.ids[best_rows[order]]), best_scores[order]
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+def get_snapshot(path=SNAPSHOT_DIR):
+    """Process-wide snapshot, re-mapped when a refresh replaces meta.json."""
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None:
+            _snapshot = EmbeddingSnapshot(path)
+    _snapshot.reload_if_changed()
+    return _snapshot
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["rebuild", "refresh"])
+    parser.add_argument("--path", default=SNAPSHOT_DIR)
+    parser.add_argument("--dtype", choices=SNAPSHOT_DTYPES, default=None)
+    args = parser.parse_args()
+    refresh_snapshot(args.path, dtype=args.dtype, rebuild=args.command == "rebuild")
+
+if __name__ == "__main__":
+    main()
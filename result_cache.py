@@ -0,0 +1,110 @@
+import os
+import copy
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from llm_cache import CACHE_DIR, LRUCache
+from scoring import SECTIONS, weights_version
+
+RESULT_CACHE_SIZE = 2048
+# Backstop for writers that fail to bump the generation
+RESULT_CACHE_TTL = 10 * 60     # seconds
+# get_corpus_generation re-reads the SQLite file at most this often per
+# process, so request paths (and the event loop) rarely touch it; bumps from
+# this process are seen at once, bumps from other processes within this delay
+GENERATION_CHECK_INTERVAL = 0.5  # seconds
+GENERATION_PATH = os.path.join(CACHE_DIR, "corpus_generation.sqlite3")
+
+# ------------------- Corpus generation -------------------
+# A monotonic counter bumped by every write to the resumes table. It lives in
+# a local SQLite file so readers never touch Postgres; every process sharing
+# CACHE_DIR sees the same value.
+_local = threading.local()
+_generation_memo = (None, float("-inf"))  # (value, time.monotonic() it was read at)
+
+def _generation_conn():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(os.path.abspath(GENERATION_PATH)), exist_ok=True)
+        conn = sqlite3.connect(GENERATION_PATH, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS generation (id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER)")
+        conn.execute("INSERT OR IGNORE INTO generation (id, value) VALUES (1, 0)")
+        _local.conn = conn
+    return conn
+
+def _read_generation():
+    global _generation_memo
+    value = _generation_conn().execute("SELECT value FROM generation WHERE id = 1").fetchone()[0]
+    _generation_memo = (value, time.monotonic())
+    return value
+
+def get_corpus_generation():
+    value, checked = _generation_memo
+    if time.monotonic() - checked < GENERATION_CHECK_INTERVAL:
+        return value
+    return _read_generation()
+
+def bump_corpus_generation():
+    """Invalidate every cached match result; call after committing resume writes."""
+    conn = _generation_conn()
+    conn.execute("UPDATE generation SET value = value + 1 WHERE id = 1")
+    return _read_generation()
+
+# ------------------- Result cache -------------------
+def jd_embedding_hash(jd_embeddings):
+    digest = hashlib.sha1()
+    for section in SECTIONS:
+        digest.update(np.asarray(jd_embeddings[section], dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+def result_key(jd_embeddings, allowed_states, top_n, **params):
+    """(JD embedding hash, allowed states, top_n, weights version, search params)."""
+    return (
+        jd_embedding_hash(jd_embeddings),
+        tuple(sorted(allowed_states)),
+        top_n,
+        weights_version(),
+        tuple(sorted(params.items())),
+    )
+
+class ResultCache:
+    """Ranked match lists, valid only for the corpus generation they were
+    computed at and for at most ``ttl`` seconds."""
+
+    def __init__(self, maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL):
+        self.lru = LRUCache(maxsize)
+        self.ttl = ttl
+        self.stale = 0
+
+    def get(self, key):
+        entry = self.lru.get(key)
+        if entry is None:
+            return None
+        generation, expires, results = entry
+        if generation != get_corpus_generation() or time.time() >= expires:
+            self.stale += 1
+            return None
+        # Callers may mutate the dicts they get back
+        return copy.deepcopy(results)
+
+    def set(self, key, results, generation):
+        """Store ``results`` computed at ``generation`` (read before the query
+        ran, so an ingest that races the query makes the entry stale)."""
+        self.lru.set(key, (generation, time.time() + self.ttl, copy.deepcopy(results)))
+
+    def stats(self):
+        return {**self.lru.stats(), "stale": self.stale, "corpus_generation": get_corpus_generation()}
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache():
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = ResultCache()
+    return _result_cache
@@ -1,45 +1,231 @@
 import os
+import json
 import shutil
-from extract_text import extract_text
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from extract_text import extract_text, extract_text_limited, ExtractionPool
 from clean_text import clean_text
-from groq_extractor import extract_structured_info_groq
-from db import insert_resume_into_db, get_db_connection
+from groq_extractor import extract_structured_info_groq, MAX_INPUT_CHARS
+from db import insert_resumes_into_db, insert_resume_into_db, get_db_connection, db_connection
+from fingerprint import sha256_bytes, sha256_file, fingerprint_text, find_known_files, find_exact_duplicate, \
+    find_duplicate
 
 RESUME_FOLDER = "./resumes"
 PROCESSED_FOLDER = "./resumes/processed"
+CHECKPOINT_FILE = os.path.join(RESUME_FOLDER, ".ingest_checkpoint.jsonl")
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.doc')
+
+# --- Pipeline tuning ---
+EXTRACT_WORKERS = os.cpu_count() or 4   # process pool for PDF/DOCX parsing
+LLM_CONCURRENCY = 4                     # concurrent Groq requests
+DB_BATCH_SIZE = 64                      # resumes per embed + bulk insert
+MAX_IN_FLIGHT = 256                     # files held in memory between stages
+# The LLM reads only the first MAX_INPUT_CHARS of the cleaned text, so stop
+# extracting well past that (clean_text strips punctuation and whitespace)
+EXTRACT_CHAR_BUDGET = 3 * MAX_INPUT_CHARS
 
 # Create processed folder if it doesn't exist
 os.makedirs(PROCESSED_FOLDER, exist_ok=True)
 
-def process_all_resumes():
-    conn = get_db_connection()
+def _extract_and_fingerprint(path):
+    # Runs in an ExtractionPool worker (memory-capped, killed by the parent past
+    # EXTRACT_TIMEOUT), so the MinHash is computed there too
+    text = clean_text(extract_text(path, char_budget=EXTRACT_CHAR_BUDGET, page_workers=1))
+    return text, fingerprint_text(text)
+
+# ------------------- Single-file ingest -------------------
+def _ingest(file_sha256, extract):
+    """Ingest one resume; returns "ok", "skipped" or the dedup status.
+
+    Fingerprints are checked before each expensive step: the raw bytes before
+    extraction, the normalized text and its MinHash before the LLM call.
+    """
+    with db_connection() as conn, conn.cursor() as cur:
+        if find_exact_duplicate(cur, file_sha256=file_sha256) is not None:
+            return "duplicate"
+
+    text = clean_text(extract())
+    fingerprint = fingerprint_text(text, file_sha256)
+    with db_connection() as conn, conn.cursor() as cur:
+        duplicate = find_duplicate(cur, fingerprint)
+    if duplicate is not None:
+        return duplicate[0]
+
+    structured_info = extract_structured_info_groq(text)
+    if not structured_info:
+        return "skipped"
+    with db_connection() as conn:
+        return "ok" if insert_resume_into_db(conn, structured_info, fingerprint) else "skipped"
+
+def ingest_resume_bytes(content, filename):
+    return _ingest(sha256_bytes(content),
+                   lambda: extract_text_limited(content, filename, char_budget=EXTRACT_CHAR_BUDGET))
 
-    for file in os.listdir(RESUME_FOLDER):
-        path = os.path.join(RESUME_FOLDER, file)
+def ingest_resume_file(path):
+    return _ingest(sha256_file(path), lambda: extract_text_limited(path, char_budget=EXTRACT_CHAR_BUDGET))
 
-        if not os.path.isfile(path) or not file.lower().endswith(('.pdf', '.docx', '.doc')):
+# ------------------- Checkpointing -------------------
+def _file_key(path):
+    stat = os.stat(path)
+    return f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+def load_checkpoint(checkpoint_file=CHECKPOINT_FILE):
+    done = set()
+    if not os.path.exists(checkpoint_file):
+        return done
+    with open(checkpoint_file) as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["key"])
+            except (ValueError, KeyError):
+                # Tolerate a torn last line from a crashed run
+                continue
+    return done
+
+def _record_done(checkpoint, key, status):
+    checkpoint.write(json.dumps({"key": key, "status": status}) + "\n")
+    checkpoint.flush()
+    os.fsync(checkpoint.fileno())
+
+def _list_pending_files(folder, done):
+    pending = []
+    for file in sorted(os.listdir(folder)):
+        path = os.path.join(folder, file)
+        if not os.path.isfile(path) or not file.lower().endswith(SUPPORTED_EXTENSIONS):
             continue
+        key = _file_key(path)
+        if key in done:
+            # Finished in a previous run but the move did not happen
+            shutil.move(path, os.path.join(PROCESSED_FOLDER, file))
+            continue
+        pending.append((file, path, key))
+    return pending
+
+# ------------------- Dedup -------------------
+def _skip_known_files(conn, checkpoint, files):
+    """Drop files whose bytes were already ingested, before any extraction.
+    Returns the remaining files and their SHA-256 by checkpoint key."""
+    file_hashes = {key: sha256_file(path) for _, path, key in files}
+    with conn.cursor() as cur:
+        known = find_known_files(cur, set(file_hashes.values()))
+    conn.rollback()
 
-        print(f"\n Processing: {file}")
-        try:
-            raw_text = extract_text(path)
-            cleaned_text = clean_text(raw_text)
+    remaining = []
+    for file, path, key in files:
+        if file_hashes[key] in known:
+            print(f" Skipped (same file already ingested): {file}")
+            _finish_file(checkpoint, file, path, key, "duplicate")
+        else:
+            remaining.append((file, path, key))
+    return remaining, file_hashes
 
-            structured_info = extract_structured_info_groq(cleaned_text)
-            if structured_info:
-                success = insert_resume_into_db(conn, structured_info)
-                if success:
-                    print(f" Inserted: {file}")
+def _check_duplicate(conn, fingerprint, seen_texts):
+    """Dedup status of an extracted resume against the table and this run."""
+    if fingerprint.text_sha256 is not None:
+        if fingerprint.text_sha256 in seen_texts:
+            return "duplicate"
+        seen_texts.add(fingerprint.text_sha256)
+    with conn.cursor() as cur:
+        duplicate = find_duplicate(cur, fingerprint)
+    conn.rollback()
+    return duplicate[0] if duplicate else None
+
+# ------------------- Pipeline -------------------
+def _finish_file(checkpoint, file, path, key, status):
+    _record_done(checkpoint, key, status)
+    # Move processed file (whether inserted or skipped)
+    shutil.move(path, os.path.join(PROCESSED_FOLDER, file))
+
+def _flush_batch(conn, checkpoint, batch):
+    if not batch:
+        return
+    try:
+        results = insert_resumes_into_db(conn, [info for _, info, _ in batch],
+                                         fingerprints=[fingerprint for _, _, fingerprint in batch])
+    except Exception as e:
+        conn.rollback()
+        print(f" Error inserting batch of {len(batch)}: {e}")
+        batch.clear()
+        return
+
+    for (item, _, _), inserted in zip(batch, results):
+        file, path, key = item
+        if inserted:
+            print(f" Inserted: {file}")
+        else:
+            print(f" Skipped (already exists): {file}")
+        _finish_file(checkpoint, file, path, key, "inserted" if inserted else "duplicate")
+    batch.clear()
+
+def process_all_resumes(folder=RESUME_FOLDER, checkpoint_file=CHECKPOINT_FILE):
+    """Staged ingestion of every resume in ``folder``.
+
+    Text extraction runs in a process pool, Groq extraction in a bounded thread
+    pool and embedding + insert in bulk batches. Files already ingested (same
+    bytes, same text or a near-duplicate, see fingerprint.py) are skipped
+    before extraction or before the LLM call. Finished files are appended to
+    ``checkpoint_file`` so a crashed run resumes without redoing them.
+    """
+    files = _list_pending_files(folder, load_checkpoint(checkpoint_file))
+    print(f"\n {len(files)} resumes to process.")
+    if not files:
+        return
+
+    conn = get_db_connection()
+    batch = []
+    in_flight = {}
+    fingerprints = {}
+    seen_texts = set()
+
+    with open(checkpoint_file, "a") as checkpoint, \
+            ExtractionPool(EXTRACT_WORKERS) as extract_workers, \
+            ThreadPoolExecutor(max_workers=LLM_CONCURRENCY) as llm_pool:
+        files, file_hashes = _skip_known_files(conn, checkpoint, files)
+        queue = iter(files)
+        exhausted = False
+
+        while in_flight or not exhausted:
+            while not exhausted and len(in_flight) < MAX_IN_FLIGHT:
+                item = next(queue, None)
+                if item is None:
+                    exhausted = True
+                    break
+                in_flight[extract_workers.submit(_extract_and_fingerprint, item[1])] = ("extract", item)
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, item = in_flight.pop(future)
+                file, path, key = item
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f" Error processing {file}: {e}")
+                    continue
+
+                if stage == "extract":
+                    print(f"\n Extracted: {file}")
+                    text, fingerprint = result
+                    fingerprint = fingerprint._replace(file_sha256=file_hashes[key])
+                    duplicate = _check_duplicate(conn, fingerprint, seen_texts)
+                    if duplicate:
+                        print(f" Skipped ({duplicate.replace('_', '-')}): {file}")
+                        _finish_file(checkpoint, file, path, key, duplicate)
+                        continue
+                    fingerprints[key] = fingerprint
+                    in_flight[llm_pool.submit(extract_structured_info_groq, text)] = ("llm", item)
+                elif result:
+                    batch.append((item, result, fingerprints.pop(key, None)))
                 else:
-                    print(f" Skipped (already exists): {file}")
-            else:
-                print(f"✗ Skipped {file} due to empty structured_info.")
+                    fingerprints.pop(key, None)
+                    print(f"✗ Skipped {file} due to empty structured_info.")
+                    _finish_file(checkpoint, file, path, key, "empty")
 
-            # Optional: Move processed file (whether inserted or skipped)
-            shutil.move(path, os.path.join(PROCESSED_FOLDER, file))
+            if len(batch) >= DB_BATCH_SIZE:
+                _flush_batch(conn, checkpoint, batch)
 
-        except Exception as e:
-            print(f" Error processing {file}: {e}")
+        _flush_batch(conn, checkpoint, batch)
 
     conn.close()
 
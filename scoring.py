@@ -0,0 +1,62 @@
+import json
+import hashlib
+import numpy as np
+
+EMBEDDING_DIM = 384
+
+SECTION_WEIGHTS = {
+    "skills": 0.25,
+    "experience": 0.25,
+    "education": 0.15,
+    "job_titles": 0.35
+}
+
+# Fixed section order used for every stacked embedding matrix
+SECTIONS = list(SECTION_WEIGHTS)
+
+# Bump when the stored-vector recipe changes (not the weights; those are hashed in)
+EMBEDDING_RECIPE = "l2norm-v1"
+
+def section_weight_vector(weights=None):
+    weights = weights or SECTION_WEIGHTS
+    w = np.array([weights.get(section, 0.0) for section in SECTIONS], dtype=np.float32)
+    total = w.sum()
+    return w / total if total > 0 else w
+
+def l2_normalize(x, axis=-1):
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=axis, keepdims=True)
+    # Missing/empty sections stay zero and therefore score 0
+    return np.divide(x, norms, out=np.zeros_like(x), where=norms > 0)
+
+def jd_matrix(jd_embeddings):
+    """(S, D) float32 matrix of the JD section embeddings in SECTIONS order."""
+    return np.stack([
+        np.asarray(jd_embeddings[section], dtype=np.float32) for section in SECTIONS
+    ])
+
+def weights_version(weights=None):
+    """Marker stored next to precomputed vectors; changes with the weights."""
+    weights = weights or SECTION_WEIGHTS
+    digest = hashlib.sha1(json.dumps(weights, sort_keys=True).encode()).hexdigest()[:12]
+    return f"{EMBEDDING_RECIPE}:{digest}"
+
+def composite_vector(section_vectors, weights=None):
+    """L2-normalized SECTION_WEIGHTS-weighted sum of (…, S, D) normalized
+    section vectors in SECTIONS order; usable as a single ANN key."""
+    section_vectors = np.asarray(section_vectors, dtype=np.float32)
+    return l2_normalize(np.einsum("...sd,s->...d", section_vectors, section_weight_vector(weights)))
+
+def score_candidates(jd_embeddings, candidates, weights=None, normalized=False):
+    """Weighted cosine similarity of every candidate against the JD.
+
+    ``candidates`` is an (N, S, D) float32 array stacked in SECTIONS order.
+    Pass ``normalized=True`` when they are already unit length (as stored by
+    db.embed_resumes) to make scoring pure dot products. Returns an (N,) array.
+    """
+    if len(candidates) == 0:
+        return np.zeros(0, dtype=np.float32)
+    q = l2_normalize(jd_matrix(jd_embeddings))
+    c = candidates if normalized else l2_normalize(candidates)
+    section_sims = np.einsum("nsd,sd->ns", c, q)
+    return section_sims @ section_weight_vector(weights)